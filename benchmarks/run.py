@@ -0,0 +1,371 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+import pvlib
+
+import src
+from src.grid import resolution_of, time_grid
+
+# Constants
+FOLDER = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(os.path.dirname(FOLDER), 'validations', 'data')
+BASELINE = os.path.join(FOLDER, 'baseline.json')
+
+# One dataset per resolution, all with the full year and the coordinates of `batch.SITES`
+DATASETS = ['tucson-10', 'seville-15', 'seville-30', 'seville-60']
+MONTH = 3
+RUNS = [10, 100, 1000]
+
+# Other sites of the same year and resolution, for the multi-site cases
+PORTFOLIOS = {'tucson-10': ['oregon-10'], 'seville-60': ['madrid-60']}
+
+# Import time budgets in seconds (fresh interpreter) and packages that importing them must not load
+IMPORT_BUDGET = {'src': 0.1, 'src.model': 1.0, 'src.methods': 1.0, 'src.stream': 1.0}
+HEAVY_MODULES = ['folium', 'matplotlib', 'numba', 'pvlib', 'scipy.stats', 'sklearn']
+
+# PV system of the energy validation notebooks
+MPS = 16
+SPI = 8
+LOSS = 26.9
+MODULE = 'LG_Electronics_Inc__LG400N2W_A5'
+INVERTER = 'ABB__TRIO_50_0_TL_OUTD_US_480__480V_'
+
+
+# =============================================================================
+# Measurement
+# =============================================================================
+def measure(func:Callable, repeat:int) -> dict:
+    '''
+    Best wall time of `repeat` calls of `func` and peak memory allocated
+    (traced by `tracemalloc` in a separate call, so tracing does not slow
+    down the timed calls). A first untimed call warms up the caches.
+    '''
+    func()
+
+    seconds = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': min(seconds), 'peak_mib': peak / 1024**2}
+
+# =============================================================================
+# Import time
+# =============================================================================
+def import_time(module:str, repeat:int) -> dict:
+    '''
+    Best time of `import <module>` in `repeat` fresh interpreters, and the
+    packages of HEAVY_MODULES that it loads.
+    '''
+    code = ('import sys, time; start = time.perf_counter(); import ' + module + '; seconds = time.perf_counter() - start; '
+            f'print(seconds); print(",".join(m for m in {HEAVY_MODULES} if m in sys.modules))')
+
+    seconds = []
+
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=os.path.dirname(FOLDER)).stdout.split('\n')
+        seconds.append(float(output[0]))
+
+    return {'seconds': min(seconds), 'budget': IMPORT_BUDGET[module], 'heavy_modules': [m for m in output[1].split(',') if m != '']}
+
+# =============================================================================
+# Cases
+# =============================================================================
+def cases(dataset:str, runs:list) -> list:
+    '''
+    (name, runs, function) of every benchmark of a dataset. `runs` is None
+    for the cases that do not depend on the quantity of runs.
+    '''
+    site = dataset.split('-')[0]
+
+    raw = src.loader.load(path=os.path.join(DATA, f'{dataset}.csv')).fillna(0)
+    df = src.methods.clear_sky_index(data=raw.copy(), column='ghi_wm2', **src.batch.SITES[site])
+
+    year = int(df.index.year[0])
+    resolution = resolution_of(df.index)
+    n_times = time_grid(resolution).n_times
+
+    aux_irradiance = src.utils.analysis(df=df, year=year, month=MONTH, irradiance_column='ghi_wm2', resolution=resolution, plot=False)
+
+    # Sky condition with the most historical days of the month
+    sky_condition = max(aux_irradiance['bootstrap'], key=lambda sc: len(aux_irradiance['bootstrap'][sc]))
+
+    # Measured days and clear-sky irradiance of the month for the metrics
+    data = df.loc[(df.index.year == year) & (df.index.month == MONTH)]
+    measured = data['ghi_wm2'].to_numpy()
+    hcs = data['ics_wm2'].to_numpy()[:n_times]
+    tmod = np.full(n_times, 25.0)
+    timestamps = data.index[:n_times]
+
+    module = pvlib.pvsystem.retrieve_sam(name='CECMod')[MODULE]
+    inverter = pvlib.pvsystem.retrieve_sam(name='CECInverter')[INVERTER]
+
+    cache_dir = tempfile.mkdtemp()
+
+    def clear_sky_index_cached():
+        directory = src.cache.SETTINGS['directory']
+        src.cache.configure(directory=cache_dir)
+
+        try:
+            return src.methods.clear_sky_index(data=raw.copy(), column='ghi_wm2', cache=True, **src.batch.SITES[site])
+
+        finally:
+            src.cache.configure(directory=directory)
+
+    items = [('clear_sky_index', None, lambda: src.methods.clear_sky_index(data=raw.copy(), column='ghi_wm2', **src.batch.SITES[site])),
+             ('clear_sky_index[cache]', None, clear_sky_index_cached),
+             ('analysis', None, lambda: src.utils.analysis(df=df, year=year, month=MONTH, irradiance_column='ghi_wm2', resolution=resolution, plot=False)),
+             ('model.fit', None, lambda: src.model.SyntheticIrradianceModel().fit(df=df, irradiance_column='ghi_wm2', year=year, month=MONTH))]
+
+    # Portfolio of the dataset and the other sites of PORTFOLIOS
+    portfolio = {dataset: df}
+
+    for name in PORTFOLIOS.get(dataset, []):
+        other = src.loader.load(path=os.path.join(DATA, f'{name}.csv')).fillna(0)
+        portfolio[name] = src.methods.clear_sky_index(data=other, column='ghi_wm2', **src.batch.SITES[name.split('-')[0]])
+
+    if len(portfolio) > 1:
+        sites = src.multisite.MultiSiteModel().fit(data=portfolio, irradiance_column='ghi_wm2', year=year, month=MONTH)
+
+        items += [('multisite.fit', None, lambda: src.multisite.MultiSiteModel().fit(data=portfolio, irradiance_column='ghi_wm2', year=year, month=MONTH))]
+
+    for n in runs:
+        synt = src.model.SyntheticIrradianceModel().fit(df=df, irradiance_column='ghi_wm2', year=year, month=MONTH).sample(sky_condition=sky_condition, runs=n, seed=0)
+
+        def metric_per_run(metric, synt=synt):
+            return [metric(synt[:, r]) for r in range(synt.shape[1])]
+
+        items += [('stochastic', n, lambda n=n: src.methods.stochastic(dictionary=aux_irradiance['stochastic'], year=year, month=MONTH, sky_condition=sky_condition, runs=n, seed=0)),
+                  ('bootstrap', n, lambda n=n: src.methods.bootstrap(dictionary=aux_irradiance['bootstrap'], year=year, month=MONTH, sky_condition=sky_condition, resolution=resolution, runs=n, seed=0)),
+                  ('sequential[stochastic]', n, lambda n=n: src.methods.sequential(data=df, irradiance_column='ghi_wm2', year=year, month=MONTH, sky_condition=sky_condition, method='stochastic', confidence_interval=0.95, runs=n, seed=0)),
+                  ('sequential[bootstrap]', n, lambda n=n: src.methods.sequential(data=df, irradiance_column='ghi_wm2', year=year, month=MONTH, sky_condition=sky_condition, method='bootstrap', confidence_interval=0.95, runs=n, seed=0)),
+                  ('metrics.standard_deviation_increments', n, lambda synt=synt: src.metrics.standard_deviation_increments(data=synt)),
+                  ('metrics.stability_index', n, lambda synt=synt: src.metrics.stability_index(data=synt)),
+                  ('metrics.variability_index', n, lambda synt=synt: src.metrics.variability_index(timestamps=timestamps, ghi=synt, hcs=hcs)),
+                  ('metrics.overlapping_coefficient', n, lambda synt=synt: src.metrics.overlapping_coefficient(sample1=measured, sample2=synt)),
+                  ('metrics.iccdf', n, lambda per_run=metric_per_run: per_run(lambda s: src.metrics.iccdf(data=s))),
+                  ('metrics.kolmogorov_smirnov', n, lambda per_run=metric_per_run: per_run(lambda s: src.metrics.kolmogorov_smirnov(sample1=measured, sample2=s))),
+                  ('metrics.kullback_leibler_divergence', n, lambda per_run=metric_per_run: per_run(lambda s: src.metrics.kullback_leibler_divergence(sample1=hcs, sample2=s))),
+                  ('metrics.root_mean_squared_error', n, lambda per_run=metric_per_run: per_run(lambda s: src.metrics.root_mean_squared_error(target=hcs, predicted=s))),
+                  ('metrics.mean_absolute_percentage_error', n, lambda per_run=metric_per_run: per_run(lambda s: src.metrics.mean_absolute_percentage_error(target=hcs+1, predicted=s))),
+                  ('metrics.median_absolute_percentage_error', n, lambda per_run=metric_per_run: per_run(lambda s: src.metrics.median_absolute_percentage_error(target=hcs+1, predicted=s))),
+                  # One measured day as reference, so the KLD (position by position) is also computed
+                  ('metrics.compare_distributions', n, lambda synt=synt: src.metrics.compare_distributions(reference=measured[:n_times], synthetic=synt)),
+                  ('metrics.energy', n, lambda synt=synt: src.metrics.energy(irradiance=synt, tmod=tmod, resolution=resolution, inverter=inverter, module=module, mps=MPS, spi=SPI, loss=LOSS))]
+
+        if len(portfolio) > 1:
+            items += [('multisite.sample[bootstrap]', n, lambda n=n: sites.sample(runs=n, method='bootstrap', seed=0)),
+                      ('multisite.sample[copula]', n, lambda n=n: sites.sample(runs=n, method='copula', seed=0))]
+
+    return items
+
+# =============================================================================
+# Suite
+# =============================================================================
+def run(datasets:list=None, runs:list=None, repeat:int=3, select:str=None) -> dict:
+    '''
+    Run every case of `cases` for each dataset and quantity of runs. Returns
+    a dictionary {'<case>[<dataset>,runs=<runs>]': record}, where each record
+    has the best time in seconds, the throughput in runs/s (calls/s for the
+    cases without runs), the peak memory in MiB, or the error raised.
+    '''
+    results = {}
+
+    for module in IMPORT_BUDGET:
+        key = f'import[{module}]'
+
+        if select is None or select in key:
+            results[key] = import_time(module=module, repeat=repeat)
+
+            print(format_record(key=key, record=results[key]), flush=True)
+
+    for dataset in datasets or DATASETS:
+        for name, n, func in cases(dataset=dataset, runs=runs or RUNS):
+            if select is not None and select not in name:
+                continue
+
+            key = f'{name}[{dataset}]' if n is None else f'{name}[{dataset},runs={n}]'
+
+            try:
+                record = measure(func=func, repeat=repeat)
+                record['throughput'] = (n or 1) / record['seconds']
+
+            except Exception as e:
+                record = {'error': f'{type(e).__name__}: {e}'}
+
+            results[key] = record
+
+            print(format_record(key=key, record=record, runs=n), flush=True)
+
+    return results
+
+def format_record(key:str, record:dict, runs:int=None) -> str:
+    '''
+    One line of the report.
+    '''
+    if 'error' in record:
+        return f'{key:<72} error: {record["error"][:60]}'
+
+    if 'budget' in record:
+        return f'{key:<72} {record["seconds"]*1e3:>10.2f} ms (budget {record["budget"]*1e3:.0f} ms) {" ".join(record["heavy_modules"])}'
+
+    unit = 'runs/s' if runs is not None else 'calls/s'
+
+    return f'{key:<72} {record["seconds"]*1e3:>10.2f} ms {record["throughput"]:>12.1f} {unit:<7} {record["peak_mib"]:>8.2f} MiB'
+
+# =============================================================================
+# Baseline comparison
+# =============================================================================
+def compare(results:dict, baseline:dict, tolerance:float) -> list:
+    '''
+    Cases slower, or with a higher peak memory, than the baseline by more
+    than `tolerance` (relative), or that fail while they passed before.
+    '''
+    regressions = []
+
+    for key, record in results.items():
+        reference = baseline.get(key)
+
+        if reference is None or 'error' in reference:
+            continue
+
+        if 'error' in record:
+            regressions.append(f'{key}: {record["error"]}')
+            continue
+
+        for field in ['seconds', 'peak_mib']:
+            if field not in record or field not in reference:
+                continue
+
+            if record[field] > reference[field] * (1 + tolerance) and record[field] - reference[field] > 1e-3:
+                regressions.append(f'{key}: {field} {reference[field]:.4g} -> {record[field]:.4g} ({record[field]/reference[field]-1:+.0%})')
+
+    return regressions
+
+# =============================================================================
+# Import budget
+# =============================================================================
+def over_budget(results:dict) -> list:
+    '''
+    Imports slower than their budget or that load a package of HEAVY_MODULES.
+    '''
+    failures = []
+
+    for key, record in results.items():
+        if 'budget' in record:
+            if record['seconds'] > record['budget']:
+                failures.append(f'{key}: {record["seconds"]:.3f} s over the budget of {record["budget"]:.3f} s')
+
+            if len(record['heavy_modules']) > 0:
+                failures.append(f'{key}: loads {", ".join(record["heavy_modules"])}')
+
+    return failures
+
+# =============================================================================
+# Command line
+# =============================================================================
+def main(argv:list=None) -> int:
+    '''
+    Command line of the benchmark suite. From the root folder:
+
+    python -m benchmarks.run --save              # run and store the baseline of this machine
+    python -m benchmarks.run --compare           # run and report regressions against it
+    python -m benchmarks.run --quick -k sequential
+
+    The exit status is 1 when `--compare` finds regressions, when a case
+    raises an error, or when an import exceeds its budget in IMPORT_BUDGET.
+    '''
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='Performance benchmarks of the generators and metrics.')
+    parser.add_argument('--datasets', nargs='*', default=None, choices=DATASETS)
+    parser.add_argument('--runs', nargs='*', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--quick', action='store_true', help='one dataset, 10 and 100 runs, one repetition')
+    parser.add_argument('-k', dest='select', default=None, help='only the cases whose name contains this text')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='compare the results with the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    if args.quick == True:
+        args.datasets = args.datasets or ['seville-30']
+        args.runs = args.runs or [10, 100]
+        args.repeat = 1
+
+    results = run(datasets=args.datasets, runs=args.runs, repeat=args.repeat, select=args.select)
+
+    status = 0
+
+    failures = over_budget(results=results)
+
+    if len(failures) > 0:
+        print(f'\n{len(failures)} imports over budget.')
+
+        for failure in failures:
+            print(f'  {failure}')
+
+        status = 1
+
+    errors = [f'{key}: {record["error"]}' for key, record in results.items() if 'error' in record]
+
+    if len(errors) > 0:
+        print(f'\n{len(errors)} cases failed.')
+
+        for error in errors:
+            print(f'  {error}')
+
+        status = 1
+
+    if args.compare == True and not os.path.exists(args.baseline):
+        print(f'\nNo baseline in {args.baseline}. Timings depend on the machine, so none is shipped: run with --save first to record one.')
+
+        status = 1
+
+    elif args.compare == True:
+        with open(args.baseline, mode='r') as f:
+            baseline = json.load(f)['results']
+
+        regressions = compare(results=results, baseline=baseline, tolerance=args.tolerance)
+
+        print(f'\n{len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance:.0%}).')
+
+        for regression in regressions:
+            print(f'  {regression}')
+
+        status = max(status, int(len(regressions) > 0))
+
+    if args.save == True:
+        previous = {}
+
+        if os.path.exists(args.baseline):
+            with open(args.baseline, mode='r') as f:
+                previous = json.load(f)['results']
+
+        with open(args.baseline, mode='w') as f:
+            json.dump({'machine': {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                                   'processor': platform.processor() or platform.machine(), 'system': platform.system()},
+                       'results': {**previous, **results}}, f, indent=1, sort_keys=True)
+
+        print(f'\nBaseline stored in {args.baseline}.')
+
+    return status
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -7,11 +7,21 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logging.getLogger('numexpr').setLevel(logging.WARNING)
 
-# Scripts
-from src import methods
-from src import metrics
-from src import utils
-from src import version
+# Scripts, imported on first access (e.g. `src.methods`) so that `import src`
+# only loads what is used
+import importlib
+
+__all__ = ['annual', 'archive', 'batch', 'cache', 'kernels', 'loader', 'map', 'methods', 'metrics', 'model', 'multisite',
+           'profiling', 'result', 'rng', 'stream', 'transition', 'utils', 'version']
+
+def __getattr__(name:str):
+    if name in __all__:
+        return importlib.import_module(f'{__name__}.{name}')
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
 
 if __name__ == '__main__':
     print(f'Successfully executed {__name__}.')
\ No newline at end of file
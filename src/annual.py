@@ -0,0 +1,213 @@
+import numpy as np
+import pandas as pd
+
+from src import rng as random_state
+from src import utils
+from src.grid import time_grid
+from src.model import METHODS, SAMPLERS, SKY_CONDITIONS, SyntheticIrradianceModel
+
+
+# =============================================================================
+# Sky condition transition matrices
+# =============================================================================
+def transition_matrices(labels:pd.Series) -> np.ndarray:
+    '''
+    Day-to-day sky condition transition matrices of each month, from the day
+    labels of `utils.sky_condition_labels`, with shape (12, 5, 5). The entry
+    [m-1, i, j] is the probability that a day of month m has sky condition
+    j+1 given that the previous day had sky condition i+1.
+
+    Transitions from or to days without kc data (label 0) are ignored. Rows
+    without observed transitions fall back to the frequency of each sky
+    condition in the month, and months without labelled days to the
+    frequency over the whole series.
+    '''
+    values = labels.to_numpy()
+    months = labels.index.month.to_numpy()
+
+    counts = np.zeros((12, 5, 5))
+    frequency = np.zeros((12, 5))
+
+    # Pairs of consecutive days, counted in the month of the second day
+    consecutive = (np.diff(labels.index.to_numpy()) == np.timedelta64(1, 'D')) & (values[:-1] > 0) & (values[1:] > 0)
+
+    np.add.at(counts, (months[1:][consecutive]-1, values[:-1][consecutive]-1, values[1:][consecutive]-1), 1)
+    np.add.at(frequency, (months[values > 0]-1, values[values > 0]-1), 1)
+
+    frequency[frequency.sum(axis=1) == 0] = frequency.sum(axis=0)
+    frequency = frequency / np.maximum(frequency.sum(axis=1, keepdims=True), 1)
+
+    empty = counts.sum(axis=2) == 0
+    counts[empty] = np.broadcast_to(frequency[:, None, :], counts.shape)[empty]
+
+    return counts / np.maximum(counts.sum(axis=2, keepdims=True), 1e-300)
+
+# =============================================================================
+# Synthetic year model
+# =============================================================================
+class SyntheticYearModel:
+    '''
+    Whole-year synthetic irradiance from a Markov chain of daily sky
+    conditions.
+
+    `fit` fits one `SyntheticIrradianceModel` per month of a year and learns
+    the day-to-day sky condition transitions of each month with
+    `transition_matrices`. `sample` draws a sky condition path per run and
+    fills all the days of a (month, sky condition) at once with the one-day
+    generators, returning a contiguous (days x times, runs) array.
+
+    Example
+    ---
+    model = SyntheticYearModel().fit(df=df, irradiance_column='ghi_wm2', year=2021)
+    synt, path = model.sample(runs=1000, method='bootstrap', seed=42)
+    '''
+    __slots__ = ('irradiance_column', 'year', 'resolution', 'models', 'transitions', 'initial')
+
+    def __init__(self):
+        self.irradiance_column = None
+        self.year = None
+        self.resolution = None
+
+        # One SyntheticIrradianceModel per month (1 to 12)
+        self.models = None
+
+        # Monthly transition matrices, shape (12, 5, 5), and sky condition distribution of the first day
+        self.transitions = None
+        self.initial = None
+
+    def fit(self, df:pd.DataFrame, irradiance_column:str, year:int) -> 'SyntheticYearModel':
+        '''
+        Fit the model to a pd.DataFrame with the irradiance and clear-sky
+        index (kc) columns, as returned by `methods.clear_sky_index`. The
+        twelve months of `year` must be present.
+        '''
+        data = df.loc[df.index.year == year]
+
+        # Catching exception
+        missing = sorted(set(range(1, 13)) - set(data.index.month))
+
+        if len(missing) > 0:
+            raise ValueError(f'There is no information related to the months {missing} of {year}.')
+
+        labels = utils.sky_condition_labels(data=data)
+
+        unlabelled = sorted(set(range(1, 13)) - set(labels.index.month[labels.values > 0]))
+
+        if len(unlabelled) > 0:
+            raise ValueError(f'There are no days with clear-sky index (kc) information in the months {unlabelled} of {year}.')
+
+        self.models = {month: SyntheticIrradianceModel().fit(df=data, irradiance_column=irradiance_column, year=year, month=month) for month in range(1, 13)}
+        self.transitions = transition_matrices(labels=labels)
+
+        # Sky condition frequency of January for the first day
+        january = labels.loc[(labels.index.month == 1) & (labels.values > 0)].to_numpy()
+        self.initial = np.bincount(january-1, minlength=5) / len(january)
+
+        self.irradiance_column = irradiance_column
+        self.year = year
+        self.resolution = self.models[1].resolution
+
+        return self
+
+    @property
+    def n_days(self) -> int:
+        '''
+        Quantity of days of the generated year.
+        '''
+        return pd.Timestamp(year=self.year, month=12, day=31).dayofyear
+
+    @property
+    def times(self) -> pd.DatetimeIndex:
+        '''
+        Timestamps of the rows of the generated sequences.
+        '''
+        return pd.date_range(start=pd.Timestamp(year=self.year, month=1, day=1), periods=self.n_days*time_grid(self.resolution).n_times, freq=f'{time_grid(self.resolution).seconds}s')
+
+    def sample(self, runs:int, method:str='bootstrap', seed:int|np.random.SeedSequence|np.random.Generator=None, sequential:bool=True,
+               confidence_interval:float=0.95, stitch:bool=False, offset:int=0, block_size:int=random_state.BLOCK_SIZE) -> tuple:
+        '''
+        Generate `runs` synthetic years.
+
+        Each run follows its own sky condition path, drawn from the monthly
+        transition matrices, and each day is generated with the model of its
+        month as in `SyntheticIrradianceModel.sample`. With `stitch=True` the
+        jump between the last value of a day and the first of the next is
+        spread over the first hour of the next day, so the sequence is
+        continuous across midnight.
+
+        Random draws follow `seed` as described in `rng.draw`.
+
+        Returns a tuple with the irradiance, shape (days x times, runs), and
+        the sky condition number (1 to 5) of each day, shape (days, runs).
+        '''
+        # Catching exception
+        if self.models is None:
+            raise ValueError('The model must be fitted before sampling. Call `fit` first.')
+
+        if method not in (METHODS if sequential == True else SAMPLERS):
+            raise ValueError(f"An invalid method ({method}) for synthetic solar irradiance generation was selected. Select one of {METHODS if sequential == True else SAMPLERS}.")
+
+        def kernel(n, rng):
+            return self._sample_runs(runs=n, method=method, sequential=sequential, confidence_interval=confidence_interval, stitch=stitch, rng=rng)
+
+        return random_state.draw(kernel=kernel, runs=runs, seed=seed, offset=offset, block_size=block_size)
+
+    def _sample_runs(self, runs:int, method:str, sequential:bool, confidence_interval:float, stitch:bool, rng:np.random.Generator=None) -> tuple:
+        '''
+        Sky condition paths and irradiance of `runs` years drawn from `rng`
+        (or from the global NumPy state when None).
+        '''
+        random = np.random if rng is None else rng
+
+        n_times = time_grid(self.resolution).n_times
+        months = pd.date_range(start=pd.Timestamp(year=self.year, month=1, day=1), periods=self.n_days, freq='D').month.to_numpy()
+
+        # Cumulative transition probabilities (exactly 1 in the last state)
+        cumulative = np.cumsum(self.transitions, axis=2)
+        cumulative[..., -1] = 1
+
+        initial = np.cumsum(self.initial)
+        initial[-1] = 1
+
+        # Sky condition paths (0 to 4), one day at a time for all runs
+        path = np.empty((self.n_days, runs), dtype=np.int8)
+        path[0] = (random.random(runs)[:, None] >= initial).sum(axis=1)
+
+        for day in range(1, self.n_days):
+            path[day] = (random.random(runs)[:, None] >= cumulative[months[day]-1, path[day-1]]).sum(axis=1)
+
+        # Irradiance of every (month, sky condition), generated in one call
+        synt = np.zeros((self.n_days, n_times, runs))
+
+        for month in range(1, 13):
+            for sky, sky_condition in enumerate(SKY_CONDITIONS):
+                day_idx, run_idx = np.nonzero((months == month)[:, None] & (path == sky))
+
+                if len(day_idx) > 0:
+                    synt[day_idx, :, run_idx] = self.models[month].sample(sky_condition=sky_condition,
+                                                                          runs=len(day_idx),
+                                                                          method=method,
+                                                                          seed=rng,
+                                                                          sequential=sequential,
+                                                                          confidence_interval=confidence_interval).T
+
+        if stitch == True:
+            _stitch(synt, steps=max(int(60//self.resolution), 1))
+
+        return synt.reshape(self.n_days*n_times, runs), path + 1
+
+# =============================================================================
+# Stitching of consecutive days
+# =============================================================================
+def _stitch(synt:np.ndarray, steps:int) -> None:
+    '''
+    Spread the jump between consecutive days of a (days, times, runs) array
+    over the first `steps` values of each following day, in place, linearly
+    decreasing from the whole jump to zero. Negative values are set to 0.
+    '''
+    steps = min(steps, synt.shape[1]-1)
+
+    jump = synt[:-1, -1] - synt[1:, 0]
+    synt[1:, :steps] += jump[:, None, :] * (1 - np.arange(steps) / steps)[None, :, None]
+
+    np.maximum(synt, 0, out=synt)
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from src import profiling
+from src import utils
+from src.grid import resolution_of, time_grid
+from src.transition import TransitionIndex
+
+# Constants
+SKY_CONDITIONS = ['sc1', 'sc2', 'sc3', 'sc4', 'sc5']
+
+
+# =============================================================================
+# Day archive
+# =============================================================================
+class DayArchive:
+    '''
+    Day-of-year / sky-condition index of a multi-year archive, for fitting
+    on days pooled across years instead of a single (year, month).
+
+    The archive is scanned once: every day is labelled by sky condition
+    (with `utils.sky_condition_labels`) and its values are placed on the
+    time grid (see `grid.TimeGrid.align`) in a (days x times) matrix, next
+    to the date, year, month and day of the year of each day. A selection
+    (all the years of a month, or the days within ±`window` days of a day
+    of the year) is then a mask over these per-day arrays and only copies
+    the selected rows.
+
+    Example
+    ---
+    archive = DayArchive(data=df, irradiance_column='ghi_wm2')
+    model = SyntheticIrradianceModel().fit_pooled(archive=archive, day_of_year=80, window=15)
+    '''
+    __slots__ = ('irradiance_column', 'resolution', 'dates', 'years', 'months', 'day_of_year', 'labels', 'matrix')
+
+    def __init__(self, data:pd.DataFrame, irradiance_column:str, limit:int=0):
+        '''
+        Index a pd.DataFrame with the irradiance and clear-sky index (kc)
+        columns, as returned by `methods.clear_sky_index`. Missing times are
+        NaN, except for gaps of up to `limit` times that are interpolated
+        (see `grid.fill_gaps`), and days without any data are left out.
+        '''
+        # Constants
+        RESOLUTION = resolution_of(data.index)
+
+        with profiling.stage('archive', rows=len(data)) as timer:
+            # Days of the archive on the time grid
+            matrix, dates = time_grid(RESOLUTION).align(data[irradiance_column], limit=limit)
+            matrix = np.asarray(matrix, dtype=float)
+
+            measured = ~np.isnan(matrix).all(axis=1)
+
+            self.matrix = matrix[measured]
+            self.dates = dates[measured]
+
+            # Sky condition of each day, 0 for days without kc data
+            labels = utils.sky_condition_labels(data=data)
+            self.labels = labels.reindex(self.dates, fill_value=0).to_numpy()
+
+            timer.add('days', len(self.dates))
+
+        self.years = self.dates.year.to_numpy()
+        self.months = self.dates.month.to_numpy()
+
+        # Day of the year in a common (non-leap) calendar, so the same date has the same day in every year
+        self.day_of_year = self.dates.dayofyear.to_numpy() - (self.dates.is_leap_year & (self.months > 2))
+
+        self.irradiance_column = irradiance_column
+        self.resolution = RESOLUTION
+
+    @property
+    def n_days(self) -> int:
+        return len(self.dates)
+
+    def select(self, sky_condition:str, month:int=None, day_of_year:int=None, window:int=0, years:list=None) -> np.ndarray:
+        '''
+        Positions of the days of a sky condition in all the years (or in
+        `years`) of a month, or within ±`window` days of `day_of_year`
+        (wrapping around the end of the year). Days of the year are counted
+        in a non-leap calendar (80 is March 21 in every year), with February
+        29 on the same day as March 1.
+        '''
+        # Catching exception
+        if sky_condition not in SKY_CONDITIONS:
+            raise ValueError(f"An invalid sky condition ({sky_condition}) was selected. Select one of ['sc1', 'sc2', 'sc3', 'sc4', 'sc5'].")
+
+        if (month is None) == (day_of_year is None):
+            raise ValueError('Select either a month or a day of the year.')
+
+        if window < 0:
+            raise ValueError(f'An invalid window ({window}) was selected. It must be a non-negative number of days.')
+
+        mask = self.labels == int(sky_condition[-1])
+
+        if month is not None:
+            mask &= self.months == month
+
+        else:
+            distance = np.abs(self.day_of_year - day_of_year)
+            mask &= np.minimum(distance, 365 - distance) <= window
+
+        if years is not None:
+            mask &= np.isin(self.years, years)
+
+        return np.flatnonzero(mask)
+
+    def days(self, sky_condition:str, month:int=None, day_of_year:int=None, window:int=0, years:list=None) -> pd.DataFrame:
+        '''
+        Selected days (see `select`) as a (days x times) pd.DataFrame with
+        the dates as index and the 'H:MM' times as columns.
+        '''
+        positions = self.select(sky_condition=sky_condition, month=month, day_of_year=day_of_year, window=window, years=years)
+
+        return pd.DataFrame(self.matrix[positions], index=self.dates[positions], columns=time_grid(self.resolution).labels)
+
+    def transition_index(self, sky_condition:str, month:int=None, day_of_year:int=None, window:int=0, years:list=None) -> TransitionIndex:
+        '''
+        `TransitionIndex` of the selected days (see `select`), which can be
+        given to `methods.sequential` in place of the pd.DataFrame.
+        '''
+        positions = self.select(sky_condition=sky_condition, month=month, day_of_year=day_of_year, window=window, years=years)
+
+        return TransitionIndex(matrix=self.matrix[positions], resolution=self.resolution, days=self.dates[positions].to_numpy())
@@ -0,0 +1,191 @@
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src import loader
+from src import methods
+from src import rng as random_state
+from src.model import METHODS, SKY_CONDITIONS, SyntheticIrradianceModel
+
+# Constants
+SITES = {'adelaide': {'latitude': -34.92, 'longitude': 138.61, 'altitude': 54, 'time_zone': 'Australia/Adelaide'},
+         'bogota': {'latitude': 4.6024, 'longitude': -74.0674, 'altitude': 2624, 'time_zone': 'America/Bogota'},
+         'madrid': {'latitude': 40.41, 'longitude': -3.70, 'altitude': 680, 'time_zone': 'Europe/Madrid'},
+         'oregon': {'latitude': 45.52, 'longitude': -122.67, 'altitude': 18, 'time_zone': 'US/Pacific'},
+         'phoenix': {'latitude': 33.45, 'longitude': -112.06, 'altitude': 680, 'time_zone': 'America/Phoenix'},
+         'seville': {'latitude': 40.41, 'longitude': -3.70, 'altitude': 680, 'time_zone': 'Europe/Madrid'},
+         'tucson': {'latitude': 33.45, 'longitude': -112.06, 'altitude': 680, 'time_zone': 'America/Phoenix'}}
+
+# Site datasets of the current worker process, set once by `_initializer`
+_DATA = {}
+
+
+# =============================================================================
+# Job
+# =============================================================================
+class Job(NamedTuple):
+    '''
+    One generation request of the batch driver.
+    '''
+    dataset: str
+    year: int
+    month: int
+    sky_condition: str
+    method: str
+    runs: int
+
+# =============================================================================
+# Job grid
+# =============================================================================
+def grid(data:dict, runs:int, years:list=None, months:list=None, sky_conditions:list=None, methods:list=None) -> list:
+    '''
+    Jobs of every combination of dataset, year, month, sky condition and
+    method. By default all the years and months present in each dataset,
+    all the sky conditions and both methods are used.
+    '''
+    jobs = []
+
+    for dataset, df in data.items():
+        for year, month in sorted(set(zip(df.index.year, df.index.month))):
+            if (years is None or year in years) and (months is None or month in months):
+                for sky_condition, method in itertools.product(sky_conditions or SKY_CONDITIONS, methods or METHODS):
+                    jobs.append(Job(dataset=dataset, year=int(year), month=int(month), sky_condition=sky_condition, method=method, runs=runs))
+
+    return jobs
+
+# =============================================================================
+# Worker
+# =============================================================================
+def _initializer(data:dict) -> None:
+    '''
+    Receive the site datasets once per worker process instead of once per task.
+    '''
+    _DATA.update(data)
+
+def _fit_and_sample(jobs:list, irradiance_column:str, confidence_interval:float, sequential:bool, seeds:list) -> list:
+    '''
+    Fit one model for the (dataset, year, month) shared by `jobs` and sample
+    every job from it.
+    '''
+    dataset, year, month = jobs[0].dataset, jobs[0].year, jobs[0].month
+
+    model = SyntheticIrradianceModel().fit(df=_DATA[dataset], irradiance_column=irradiance_column, year=year, month=month)
+
+    return [model.sample(sky_condition=job.sky_condition,
+                         runs=job.runs,
+                         method=job.method,
+                         seed=seed,
+                         sequential=sequential,
+                         confidence_interval=confidence_interval) for job, seed in zip(jobs, seeds)]
+
+# =============================================================================
+# Batch driver
+# =============================================================================
+def run(data:dict, jobs:list, irradiance_column:str='ghi_wm2', confidence_interval:float=0.95, sequential:bool=True,
+        seed:int|np.random.SeedSequence=None, max_workers:int=None) -> dict:
+    '''
+    Run a list of `Job` over a process pool.
+
+    `data` maps each dataset name to its pd.DataFrame with the irradiance and
+    clear-sky index (kc) columns, as returned by `methods.clear_sky_index`.
+    Only the two needed columns are sent, once per worker. The jobs are
+    grouped by (dataset, year, month) so that each group is fitted once.
+
+    Each job draws from its own child of the root `seed`, given by its
+    position in `jobs`, so the results do not depend on the scheduling.
+
+    Returns a dictionary {Job: np.array (times, runs)}, with None for jobs
+    whose sky condition has no historical days.
+    '''
+    # Catching exception
+    for job in jobs:
+        if job.dataset not in data:
+            raise ValueError(f'The dataset ({job.dataset}) of the job {job} was not given.')
+
+    root = random_state.seed_sequence(seed)
+    seeds = {job: random_state.block_seed(seed=root, block=n) for n, job in enumerate(jobs)}
+
+    # Jobs grouped by (dataset, year, month)
+    groups = {}
+
+    for job in jobs:
+        groups.setdefault((job.dataset, job.year, job.month), []).append(job)
+
+    shared = {dataset: data[dataset][[irradiance_column, 'kc']] for dataset in {job.dataset for job in jobs}}
+
+    results = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_initializer, initargs=(shared,)) as executor:
+        futures = [(group, executor.submit(_fit_and_sample, group, irradiance_column, confidence_interval, sequential, [seeds[job] for job in group]))
+                   for group in groups.values()]
+
+        for group, future in futures:
+            results.update(zip(group, future.result()))
+
+    return {job: results[job] for job in jobs}
+
+# =============================================================================
+# Dataset loading
+# =============================================================================
+def load(path:str, irradiance_column:str='ghi_wm2', site:str=None) -> pd.DataFrame:
+    '''
+    Read a `validations/data` CSV file through the columnar cache of
+    `loader` and append its clear-sky index (kc) with the coordinates of
+    `site` in `SITES` (by default, the prefix of the file name, e.g.
+    'bogota' for 'bogota-30.csv').
+    '''
+    site = site or os.path.basename(path).split('-')[0]
+
+    # Catching exception
+    if site not in SITES:
+        raise ValueError(f'An invalid site ({site}) was selected. Select one of {list(SITES)}.')
+
+    df = loader.load(path=path).fillna(0)
+
+    return methods.clear_sky_index(data=df, column=irradiance_column, **SITES[site])
+
+# =============================================================================
+# Command line
+# =============================================================================
+def main(argv:list=None) -> None:
+    '''
+    Command line of the batch driver. For instance, from the root folder:
+
+    python -m src.batch validations/data/bogota-30.csv validations/data/oregon-60.csv --months 1 2 --runs 100 --output results.npz
+
+    The results are stored in a `.npz` file with one (times, runs) array per
+    job, named '<dataset>/<year>/<month>/<sky condition>/<method>'.
+    '''
+    parser = argparse.ArgumentParser(prog='python -m src.batch', description='Batch generation of one-day synthetic solar irradiance sequences.')
+    parser.add_argument('files', nargs='+', help='CSV datasets, named <site>-<resolution>.csv')
+    parser.add_argument('--column', default='ghi_wm2', help='irradiance column')
+    parser.add_argument('--years', nargs='*', type=int, default=None)
+    parser.add_argument('--months', nargs='*', type=int, default=None)
+    parser.add_argument('--sky-conditions', nargs='*', default=None, choices=SKY_CONDITIONS)
+    parser.add_argument('--methods', nargs='*', default=None, choices=METHODS)
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--confidence-interval', type=float, default=0.95)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='synthetic.npz')
+    args = parser.parse_args(argv)
+
+    data = {os.path.splitext(os.path.basename(f))[0]: load(path=f, irradiance_column=args.column) for f in args.files}
+
+    jobs = grid(data=data, runs=args.runs, years=args.years, months=args.months, sky_conditions=args.sky_conditions, methods=args.methods)
+
+    results = run(data=data, jobs=jobs, irradiance_column=args.column, confidence_interval=args.confidence_interval,
+                  seed=args.seed, max_workers=args.workers)
+
+    np.savez(args.output, **{f'{job.dataset}/{job.year}/{job.month}/{job.sky_condition}/{job.method}': synt
+                             for job, synt in results.items() if synt is not None})
+
+    print(f'{sum(synt is not None for synt in results.values())} of {len(jobs)} jobs were saved in {args.output}.')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Settings of the clear-sky cache, see `configure`
+SETTINGS = {'directory': os.environ.get('SYNTHETIC_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'synthetic', 'clearsky')),
+            'max_bytes': 512 * 1024**2,
+            'policy': 'lru'}
+
+
+# =============================================================================
+# Settings
+# =============================================================================
+def configure(directory:str=None, max_bytes:int=None, policy:str=None) -> dict:
+    '''
+    Set the folder of the clear-sky cache, its maximum size in bytes and the
+    eviction policy: 'lru' (least recently used entries are removed first)
+    or 'fifo' (oldest written entries are removed first). The folder can
+    also be set with the SYNTHETIC_CACHE_DIR environment variable.
+
+    Returns the current settings.
+    '''
+    # Catching exception
+    if policy is not None and policy not in ['lru', 'fifo']:
+        raise ValueError(f"An invalid eviction policy ({policy}) was selected. Select one of ['lru', 'fifo'].")
+
+    if max_bytes is not None and max_bytes < 0:
+        raise ValueError(f'An invalid cache size ({max_bytes}) was selected. It must be a non-negative integer.')
+
+    for key, value in {'directory': directory, 'max_bytes': max_bytes, 'policy': policy}.items():
+        if value is not None:
+            SETTINGS[key] = value
+
+    return dict(SETTINGS)
+
+# =============================================================================
+# Key
+# =============================================================================
+def _path(latitude:float, longitude:float, altitude:float, time_zone:str, start:pd.Timestamp, end:pd.Timestamp, resolution:int|float) -> str:
+    '''
+    File of a (location, time grid) in the cache folder.
+    '''
+    key = repr((float(latitude), float(longitude), float(altitude), str(time_zone),
+                pd.Timestamp(start).isoformat(), pd.Timestamp(end).isoformat(), float(resolution)))
+
+    return os.path.join(SETTINGS['directory'], hashlib.sha1(key.encode()).hexdigest() + '.npy')
+
+# =============================================================================
+# Clear-sky irradiance
+# =============================================================================
+def clearsky_ghi(latitude:float, longitude:float, altitude:float, time_zone:str, start:pd.Timestamp, end:pd.Timestamp, resolution:int|float) -> np.ndarray:
+    '''
+    Ineichen clear-sky global horizontal irradiance (Hcs) from `start` to
+    `end` every `resolution` minutes, as in `methods.clear_sky_index`.
+
+    The first call for a (location, time grid) computes it with pvlib and
+    stores it in the cache folder; later calls read it back memory-mapped,
+    skipping the Linke turbidity lookup and the solar position.
+    '''
+    path = _path(latitude=latitude, longitude=longitude, altitude=altitude, time_zone=time_zone, start=start, end=end, resolution=resolution)
+
+    if os.path.exists(path):
+        try:
+            ghi = np.load(path, mmap_mode='r')
+
+            if SETTINGS['policy'] == 'lru':
+                os.utime(path)
+
+            return ghi
+
+        except (OSError, ValueError):
+            # Unreadable entry, computed again below
+            pass
+
+    # Imported here so that cache hits do not load pvlib
+    import pvlib
+
+    location = pvlib.location.Location(latitude, longitude, time_zone, altitude)
+
+    hcs = location.get_clearsky(times=pd.date_range(start=start, end=end, freq=f'{round(resolution*60)}s', tz=time_zone), model='ineichen')
+
+    ghi = hcs['ghi'].to_numpy(dtype=np.float64)
+
+    # Atomic write, so concurrent processes never read a partial entry
+    os.makedirs(SETTINGS['directory'], exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(dir=SETTINGS['directory'], suffix='.tmp', delete=False) as f:
+        np.save(f, ghi)
+
+    os.replace(f.name, path)
+
+    _evict(keep=path)
+
+    return ghi
+
+# =============================================================================
+# Eviction
+# =============================================================================
+def _evict(keep:str=None) -> None:
+    '''
+    Remove entries, oldest first by modification time, until the cache fits
+    in `max_bytes`. The entry `keep` is never removed.
+    '''
+    entries = []
+
+    for name in os.listdir(SETTINGS['directory']):
+        if name.endswith('.npy'):
+            path = os.path.join(SETTINGS['directory'], name)
+
+            try:
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            except OSError:
+                continue
+
+    total = sum(size for _, size, _ in entries)
+
+    for _, size, path in sorted(entries):
+        if total <= SETTINGS['max_bytes']:
+            break
+
+        if path != keep:
+            try:
+                os.remove(path)
+                total -= size
+
+            except OSError:
+                continue
+
+# =============================================================================
+# Clear
+# =============================================================================
+def clear() -> None:
+    '''
+    Remove every entry of the clear-sky cache.
+    '''
+    if os.path.isdir(SETTINGS['directory']):
+        for name in os.listdir(SETTINGS['directory']):
+            if name.endswith('.npy') or name.endswith('.tmp'):
+                os.remove(os.path.join(SETTINGS['directory'], name))
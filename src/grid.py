@@ -0,0 +1,245 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+# Constants
+DAY_SECONDS = 24*60*60
+
+
+# =============================================================================
+# Resolution
+# =============================================================================
+def resolution_of(index:pd.DatetimeIndex) -> int|float:
+    '''
+    Resolution in minutes of a time index, from the median spacing of its
+    timestamps. Whole minutes are given as int and sub-minute resolutions
+    as float (e.g. 0.5 for 30 seconds).
+    '''
+    seconds = pd.Series(index.values).diff().median().total_seconds()
+
+    return day_resolution(n_times=DAY_SECONDS / seconds)
+
+def day_resolution(n_times:int) -> int|float:
+    '''
+    Resolution in minutes of a day split in `n_times` times, as int for
+    whole minutes and as float otherwise.
+    '''
+    seconds = DAY_SECONDS / n_times
+
+    return int(seconds // 60) if seconds % 60 == 0 else seconds / 60
+
+# =============================================================================
+# Time grid
+# =============================================================================
+class TimeGrid:
+    '''
+    Fixed grid of the times of one day at a resolution in minutes, which
+    can be a fraction of a minute (e.g. 0.5 for 30 seconds) as long as it
+    divides the day evenly.
+
+    The 'H:MM' labels ('H:MM:SS' below one minute) and the (hour, minute)
+    index (plus 'second' below one minute) are built with array operations
+    on first use, and grids are shared per resolution by `time_grid`.
+    `align` places raw timestamped data on the grid, one row per day.
+    '''
+    __slots__ = ('resolution', 'seconds', 'offsets', '_labels', '_multiindex')
+
+    def __init__(self, resolution:int|float):
+        seconds = resolution * 60
+
+        # Catching exception
+        if seconds <= 0 or seconds != int(seconds) or DAY_SECONDS % int(seconds) != 0:
+            raise ValueError(f'An invalid resolution ({resolution} min) was selected. It must be a whole number of seconds that divides the day evenly.')
+
+        self.resolution = resolution
+        self.seconds = int(seconds)
+
+        # Seconds from midnight of each time
+        self.offsets = np.arange(0, DAY_SECONDS, self.seconds)
+        self.offsets.flags.writeable = False
+
+        self._labels = None
+        self._multiindex = None
+
+    @property
+    def n_times(self) -> int:
+        return len(self.offsets)
+
+    def __len__(self) -> int:
+        return self.n_times
+
+    @property
+    def labels(self) -> list:
+        '''
+        'H:MM' label of each time ('H:MM:SS' below one minute).
+        '''
+        if self._labels is None:
+            hours, minutes, seconds = self.offsets // 3600, self.offsets % 3600 // 60, self.offsets % 60
+
+            labels = np.char.add(np.char.add(hours.astype(str), ':'), np.char.zfill(minutes.astype(str), 2))
+
+            if self.seconds % 60 != 0:
+                labels = np.char.add(np.char.add(labels, ':'), np.char.zfill(seconds.astype(str), 2))
+
+            self._labels = labels.tolist()
+
+        return self._labels
+
+    @property
+    def multiindex(self) -> pd.MultiIndex:
+        '''
+        (hour, minute) index of the times, with a 'second' level below one
+        minute.
+        '''
+        if self._multiindex is None:
+            self._multiindex = self.multiindex_at(offset=0)
+
+        return self._multiindex
+
+    def multiindex_at(self, offset:int) -> pd.MultiIndex:
+        '''
+        (hour, minute) index of the times shifted by `offset` seconds (see
+        `offset`), e.g. (h, 30) for hourly data at :30. A 'second' level is
+        added when the times are not whole minutes.
+        '''
+        times = self.offsets + offset
+
+        levels = [times // 3600, times % 3600 // 60]
+        names = ['hour', 'minute']
+
+        if self.seconds % 60 != 0 or offset % 60 != 0:
+            levels.append(times % 60)
+            names.append('second')
+
+        return pd.MultiIndex.from_arrays(levels, names=names)
+
+    def offset(self, index:pd.DatetimeIndex) -> int:
+        '''
+        Seconds from the grid times to the (wall-clock) timestamps of `index`,
+        from its first timestamp: 0 for data on the grid, 1800 for hourly
+        data at :30.
+        '''
+        if len(index) == 0:
+            return 0
+
+        first = index[0].tz_localize(None) if index.tz is not None else index[0]
+
+        return int((first - first.normalize()).total_seconds()) % self.seconds
+
+    def position(self, time:str) -> int:
+        '''
+        Position of the time at or before an 'H:MM' (or 'H:MM:SS') string.
+        '''
+        parts = [int(k) for k in time.split(':')]
+        offset = parts[0]*3600 + parts[1]*60 + (parts[2] if len(parts) > 2 else 0)
+
+        return offset // self.seconds
+
+    def align(self, data:pd.Series, limit:int=0) -> tuple:
+        '''
+        Values of a timestamped pd.Series placed on the grid, as a (days x
+        times) array with one row per calendar day from the first to the last
+        day of the data. Each value goes to the time at or before its
+        timestamp, so data at a fixed offset from the grid (e.g. every hour
+        at :30) keeps its order. Times without data are NaN, except for gaps
+        of up to `limit` consecutive times that are filled by linear
+        interpolation (see `fill_gaps`).
+
+        A timezone-aware index is placed by its local (wall-clock) time, so
+        the days are the local days. Values that fall on the same time of a
+        day (e.g. the hour repeated when daylight saving time ends) are
+        averaged, and the hour skipped when it starts is left NaN.
+
+        Returns the array and the pd.DatetimeIndex of the days. The array
+        keeps the dtype of the data when no time is missing or averaged.
+        '''
+        index = data.index.tz_localize(None) if data.index.tz is not None else data.index
+
+        timestamps = index.values.astype('datetime64[s]')
+        days = timestamps.astype('datetime64[D]')
+
+        dates = np.arange(days.min(), days.max() + 1) if len(days) > 0 else np.array([], dtype='datetime64[D]')
+
+        row = (days - dates[0]).astype(np.intp) if len(days) > 0 else np.array([], dtype=np.intp)
+        column = ((timestamps - days).astype(np.int64) // self.seconds).astype(np.intp)
+
+        # Mean of the values of each time of each day, NaN for the times without values
+        cell = row * self.n_times + column
+        values = data.to_numpy(dtype=float)
+        measured = ~np.isnan(values)
+
+        size = len(dates) * self.n_times
+        total = np.bincount(cell[measured], weights=values[measured], minlength=size)
+        count = np.bincount(cell[measured], minlength=size)
+
+        with np.errstate(invalid='ignore'):
+            matrix = (total / count).reshape(len(dates), self.n_times)
+
+        matrix = fill_gaps(matrix=matrix, limit=limit)
+
+        repeated = len(np.unique(cell)) < len(cell)
+
+        if np.issubdtype(data.dtype, np.number) and not np.issubdtype(data.dtype, np.floating) and not repeated and not np.isnan(matrix).any():
+            matrix = matrix.astype(data.dtype)
+
+        return matrix, pd.DatetimeIndex(dates.astype('datetime64[ns]'))
+
+@functools.lru_cache(maxsize=None)
+def time_grid(resolution:int|float) -> TimeGrid:
+    '''
+    Shared `TimeGrid` of a resolution in minutes, built once per resolution.
+    '''
+    return TimeGrid(resolution=resolution)
+
+# =============================================================================
+# Gap filling
+# =============================================================================
+def fill_gaps(matrix:np.ndarray, limit:int) -> np.ndarray:
+    '''
+    Linear interpolation of the gaps (runs of NaN values) of a (days x
+    times) array read row after row, i.e. in time order when the rows are
+    consecutive days. Only gaps of up to `limit` values with data on both
+    sides are filled; longer gaps stay NaN.
+    '''
+    flat = np.array(matrix, dtype=float).ravel()
+    missing = np.isnan(flat)
+
+    if limit <= 0 or missing.any() == False or missing.all() == True:
+        return matrix
+
+    # Gap of each missing value, numbered by the quantity of values with data before it
+    gap = np.cumsum(~missing)
+    length = np.bincount(gap[missing], minlength=gap[-1]+1)
+
+    fill = missing & (gap > 0) & (gap < gap[-1]) & (length[gap] <= limit)
+
+    positions = np.arange(len(flat))
+    flat[fill] = np.interp(positions[fill], positions[~missing], flat[~missing])
+
+    return flat.reshape(matrix.shape)
+
+def fill_days(matrix:np.ndarray) -> np.ndarray:
+    '''
+    All the gaps of each row (day) of a (days x times) array filled by
+    linear interpolation between the values of that same day, holding the
+    first and last values before and after them. Rows without any value
+    stay NaN. Used where every time of a day needs a value (e.g. the
+    transition index of the sequential methods).
+    '''
+    matrix = np.asarray(matrix, dtype=float)
+    missing = np.isnan(matrix)
+
+    gapped = np.flatnonzero(missing.any(axis=1) & ~missing.all(axis=1))
+
+    if len(gapped) == 0:
+        return matrix
+
+    filled = matrix.copy()
+    positions = np.arange(matrix.shape[1])
+
+    for row in gapped:
+        measured = ~missing[row]
+        filled[row, ~measured] = np.interp(positions[~measured], positions[measured], matrix[row, measured])
+
+    return filled
@@ -0,0 +1,109 @@
+import functools
+import importlib.util
+
+import numpy as np
+
+# Constants
+ENGINES = ['auto', 'numpy', 'numba']
+
+# Optional compiled kernels, numba is only imported when they are first used
+NUMBA = importlib.util.find_spec('numba') is not None
+
+
+# =============================================================================
+# Engine selection
+# =============================================================================
+def engine(name:str='auto') -> str:
+    '''
+    Engine of the sequential bootstrap step: 'numba' (compiled kernel,
+    requires the numba package) or 'numpy' (vectorized over the runs).
+    'auto' selects 'numba' when it is installed and 'numpy' otherwise.
+    '''
+    # Catching exception
+    if name not in ENGINES:
+        raise ValueError(f'An invalid engine ({name}) was selected. Select one of {ENGINES}.')
+
+    if name == 'numba' and NUMBA == False:
+        raise ValueError("The 'numba' engine was selected but numba is not installed. Install it or select the 'numpy' engine.")
+
+    if name == 'auto':
+        return 'numba' if NUMBA == True else 'numpy'
+
+    return name
+
+# =============================================================================
+# Confidence-band bootstrap kernel
+# =============================================================================
+def _bootstrap_band(sorted_values:np.ndarray, following:np.ndarray, half_width:np.ndarray, synt:np.ndarray, uniform:np.ndarray) -> int:
+    '''
+    Sequential bootstrap over the arrays of a `TransitionIndex`, one run at a
+    time. `synt` has shape (times, runs) with the first time already drawn
+    and is filled in place; `uniform` has shape (times-1, runs).
+
+    For each run and time, the days whose value lies inside the confidence
+    band around the previous synthetic value are found by binary search on
+    the sorted column (with NaN sorted last, as in np.searchsorted). One of
+    these days is drawn and its value at the next time is taken. An empty
+    band keeps the previous value. The result is the same as the vectorized
+    steps of `methods._sequential_runs` with the same uniform numbers.
+
+    Returns the quantity of empty bands.
+    '''
+    n_times, runs = synt.shape
+    n_days = sorted_values.shape[1]
+    empty_bands = 0
+
+    for r in range(runs):
+        previous = synt[0, r]
+
+        for i in range(1, n_times):
+            column = sorted_values[i-1]
+            lower = previous - half_width[i-1]
+            upper = previous + half_width[i-1]
+
+            # First position not below the lower bound
+            lo, hi = 0, n_days
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if column[mid] < lower or (lower != lower and column[mid] == column[mid]):
+                    lo = mid + 1
+                else:
+                    hi = mid
+
+            # First position above the upper bound
+            start, hi = lo, n_days
+            while start < hi:
+                mid = (start + hi) // 2
+                if upper < column[mid] or (column[mid] != column[mid] and upper == upper):
+                    hi = mid
+                else:
+                    start = mid + 1
+
+            if hi > lo:
+                position = min(lo + int(np.floor(uniform[i-1, r] * (hi - lo))), hi - 1)
+                previous = following[i-1, position]
+
+            else:
+                empty_bands += 1
+
+            synt[i, r] = previous
+
+    return empty_bands
+
+@functools.cache
+def _compiled():
+    '''
+    numba compilation of `_bootstrap_band` (cached on disk by numba).
+    '''
+    import numba
+
+    return numba.njit(cache=True)(_bootstrap_band)
+
+def bootstrap_band(sorted_values:np.ndarray, following:np.ndarray, half_width:np.ndarray, synt:np.ndarray, uniform:np.ndarray) -> tuple:
+    '''
+    Compiled sequential bootstrap (see `_bootstrap_band`). Returns `synt`
+    and the quantity of empty bands.
+    '''
+    empty_bands = _compiled()(sorted_values, following, half_width, synt, uniform)
+
+    return synt, int(empty_bands)
@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Constants
+TIMESTAMP = 'timestamp'
+FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+# =============================================================================
+# Cache folder
+# =============================================================================
+def cache_path(path:str, cache_dir:str=None) -> str:
+    '''
+    Folder of the columnar cache of a CSV dataset. By default it is
+    `__npycache__/<file name>` next to the CSV file.
+    '''
+    name = os.path.splitext(os.path.basename(path))[0]
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), '__npycache__')
+
+    return os.path.join(cache_dir, name)
+
+# =============================================================================
+# Staleness
+# =============================================================================
+def _signature(path:str) -> dict:
+    '''
+    Size and modification time of the source file, to detect stale caches.
+    '''
+    stat = os.stat(path)
+
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def is_stale(path:str, cache_dir:str=None) -> bool:
+    '''
+    True when the columnar cache of `path` is missing or older than the CSV.
+    '''
+    meta = os.path.join(cache_path(path=path, cache_dir=cache_dir), 'meta.json')
+
+    if not os.path.exists(meta):
+        return True
+
+    with open(meta, mode='r') as f:
+        return json.load(f).get('source') != _signature(path=path)
+
+# =============================================================================
+# Conversion
+# =============================================================================
+def convert(path:str, cache_dir:str=None) -> str:
+    '''
+    Convert a `timestamp,<column>,...` CSV dataset into a typed columnar
+    cache: the index as int64 nanoseconds since the epoch (`index.npy`) and
+    one float64 `.npy` file per column, plus a `meta.json` with the columns
+    and the signature of the source file.
+
+    Returns the cache folder.
+    '''
+    df = pd.read_csv(filepath_or_buffer=path, sep=',', decimal='.')
+
+    timestamps = df.pop(TIMESTAMP)
+
+    # Fixed-format datetime parsing, with inference as fallback
+    try:
+        index = pd.to_datetime(timestamps, format=FORMAT)
+
+    except ValueError:
+        index = pd.to_datetime(timestamps)
+
+    folder = cache_path(path=path, cache_dir=cache_dir)
+    os.makedirs(os.path.dirname(folder), exist_ok=True)
+
+    # Written aside and moved at the end, so readers never see a partial cache
+    temp = tempfile.mkdtemp(dir=os.path.dirname(folder))
+
+    np.save(os.path.join(temp, 'index.npy'), index.to_numpy(dtype='datetime64[ns]').view(np.int64))
+
+    for column in df.columns:
+        np.save(os.path.join(temp, f'{column}.npy'), df[column].to_numpy(dtype=np.float64))
+
+    with open(os.path.join(temp, 'meta.json'), mode='w') as f:
+        json.dump({'columns': list(df.columns), 'source': _signature(path=path)}, f)
+
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(temp, folder)
+
+    return folder
+
+# =============================================================================
+# Load
+# =============================================================================
+def load(path:str, columns:list=None, float32:bool=False, cache_dir:str=None) -> pd.DataFrame:
+    '''
+    Load a `validations/data` CSV dataset as a pd.DataFrame indexed by
+    timestamp, as `pd.read_csv(..., index_col='timestamp', parse_dates=True)`.
+
+    The first call (or any call after the CSV changes) converts it into a
+    columnar cache with `convert`; later calls memory-map the cached arrays,
+    skipping the CSV and datetime parsing. The float64 columns are the
+    mapped arrays themselves (copy-on-write, so writes to the pd.DataFrame
+    never reach the cache). With `float32=True` the columns are returned
+    in single precision.
+    '''
+    if is_stale(path=path, cache_dir=cache_dir):
+        convert(path=path, cache_dir=cache_dir)
+
+    folder = cache_path(path=path, cache_dir=cache_dir)
+
+    with open(os.path.join(folder, 'meta.json'), mode='r') as f:
+        meta = json.load(f)
+
+    # Catching exception
+    columns = meta['columns'] if columns is None else columns
+
+    for column in columns:
+        if column not in meta['columns']:
+            raise ValueError(f'An invalid column ({column}) was selected. Select from {meta["columns"]}.')
+
+    index = pd.DatetimeIndex(np.array(np.load(os.path.join(folder, 'index.npy'), mmap_mode='r')).view('datetime64[ns]'), name=TIMESTAMP)
+
+    data = {}
+
+    for column in columns:
+        # Copy-on-write mapping: no copy on load, and writes stay in memory without touching the cache
+        values = np.load(os.path.join(folder, f'{column}.npy'), mmap_mode='c')
+        data[column] = values.astype(np.float32) if float32 == True else values
+
+    return pd.DataFrame(data=data, index=index, copy=False)
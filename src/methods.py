@@ -1,14 +1,28 @@
 import numpy as np
 import pandas as pd
-import pvlib
-import scipy
+
+from src import cache as cache_module
+from src import kernels
+from src import profiling
+from src import rng as random_state
+from src.grid import day_resolution, resolution_of, time_grid
+from src.result import SyntheticResult
+from src.transition import TransitionIndex, cached_index
+
+# Constants
+KNOTS = 64
 
 
 # =============================================================================
 # Stochastic
 # =============================================================================
-def stochastic(dictionary:dict, year:int, month:int, sky_condition:str, runs:int) -> dict:
+def stochastic(dictionary:dict, year:int, month:int, sky_condition:str, runs:int,
+               seed:int|np.random.SeedSequence|np.random.Generator=None, compact:bool=False, float32:bool=False) -> dict:
     '''
+    Random draws follow `seed` as described in `rng.draw`.
+
+    With `compact=True` the values of the dictionary are `SyntheticResult`
+    (in float32 with `float32=True`) instead of pd.DataFrame.
     '''
     # Catching exception
     if sky_condition not in ['sc1', 'sc2', 'sc3', 'sc4', 'sc5']:
@@ -28,40 +42,37 @@ def stochastic(dictionary:dict, year:int, month:int, sky_condition:str, runs:int
         print(f'There is no information related to the date {MONTHS[str(month)]}-{year} {sky_condition}.')
 
     else:
-        # DataFrame to store all the synthetic irradiance before store at dictionary
-        df = pd.DataFrame()
-
-        for i in range(runs):
-            # Generation of synthetic irradiance by a gaussian (normal) distribution
-            synt = np.random.normal(loc=data['mean'], scale=data['std'])
-            '''
-            if synt < data['min'].values:
-                synt = data['min'].values
+        # Generation of synthetic irradiance by a gaussian (normal) distribution clipped to min/max
+        mean, std, minimum, maximum = (data[k].to_numpy() for k in ['mean', 'std', 'min', 'max'])
 
-            if synt > data['max'].values:
-                synt = data['max'].values
-            '''
-            synt[synt < data['min']] = data['min'][synt < data['min']].values
-            synt[synt > data['max']] = data['max'][synt > data['max']].values
+        with profiling.stage('stochastic.draw', runs=runs):
+            synt = random_state.draw(kernel=lambda n, rng: _stochastic_runs(mean=mean, std=std, minimum=minimum, maximum=maximum, runs=n, rng=rng),
+                                     runs=runs,
+                                     seed=seed)
 
-            # Synthetic data storage in dataframe
-            df[f'synt{i+1}'] = synt
+        # Synthetic data storage in dataframe
+        with profiling.stage('stochastic.frame', runs=runs):
+            if compact == True:
+                df = SyntheticResult(values=synt, resolution=day_resolution(n_times=len(data)), year=year, month=month, sky_condition=sky_condition, method='stochastic', float32=float32)
 
-            if i == runs-1:
-                # Change numerical index to datetime index
-                df.set_index(data.index, inplace=True)
-                df.index.set_names(['hour', 'minute'], inplace=True)
+            else:
+                df = pd.DataFrame(data=synt, index=data.index.set_names(['hour', 'minute', 'second'][:data.index.nlevels]), columns=[f'synt{i+1}' for i in range(runs)])
 
-                # Save the synthetic data in irradsyntm1_dict
-                synthetic_irradiance[f'{MONTHS[str(month)]}{year}-{sky_condition}'] = df
+        # Save the synthetic data in irradsyntm1_dict
+        synthetic_irradiance[f'{MONTHS[str(month)]}{year}-{sky_condition}'] = df
 
     return synthetic_irradiance
 
 # =============================================================================
 # Bootstrap
 # =============================================================================
-def bootstrap(dictionary:dict, year:int, month:int, sky_condition:str, resolution:int, runs:int) -> dict:
+def bootstrap(dictionary:dict, year:int, month:int, sky_condition:str, resolution:int, runs:int,
+              seed:int|np.random.SeedSequence|np.random.Generator=None, compact:bool=False, float32:bool=False) -> dict:
     '''
+    Random draws follow `seed` as described in `rng.draw`.
+
+    With `compact=True` the values of the dictionary are `SyntheticResult`
+    (in float32 with `float32=True`) instead of pd.DataFrame.
     '''
     # Catching exception
     if sky_condition not in ['sc1', 'sc2', 'sc3', 'sc4', 'sc5']:
@@ -74,7 +85,7 @@ def bootstrap(dictionary:dict, year:int, month:int, sky_condition:str, resolutio
     MONTHS = {'1': 'Jan', '2': 'Feb', '3': 'Mar', '4': 'Apr', '5': 'May', '6': 'Jun',
               '7': 'Jul', '8': 'Aug', '9': 'Sep', '10': 'Oct', '11': 'Nov', '12': 'Dec'}
 
-    MULTIINDEX = [(i,j) for i in range(0, 24) for j in range(0, 60, resolution)]
+    MULTIINDEX = time_grid(resolution).multiindex
 
     #Calling the data from irrad_analysis dictionary previously created
     data = dictionary[sky_condition]
@@ -83,178 +94,373 @@ def bootstrap(dictionary:dict, year:int, month:int, sky_condition:str, resolutio
         print(f'There is no information related to the date {MONTHS[str(month)]}-{year} {sky_condition}.')
 
     else:
-        # DataFrame to store all the synthetic irradiance before store at dictionary
-        df = pd.DataFrame()
+        matrix = data.to_numpy()
+
+        with profiling.stage('bootstrap.draw', runs=runs):
+            synt = random_state.draw(kernel=lambda n, rng: _bootstrap_runs(matrix=matrix, runs=n, rng=rng), runs=runs, seed=seed)
+
+        # Synthetic data storage in dataframe
+        with profiling.stage('bootstrap.frame', runs=runs):
+            if compact == True:
+                df = SyntheticResult(values=synt, resolution=resolution, year=year, month=month, sky_condition=sky_condition, method='bootstrap', float32=float32)
 
-        aux_data = data.to_numpy()
+            else:
+                df = pd.DataFrame(data=synt, index=MULTIINDEX, columns=[f'synt{i+1}' for i in range(runs)])
 
-        synt = aux_data[np.random.choice(aux_data.shape[0], runs, replace=True)]
+        # Save the synthetic data in irradsyntm1_dict
+        synthetic_irradiance[f'{MONTHS[str(month)]}{year}-{sky_condition}'] = df
 
-        for i in range(runs):
-            # Synthetic data storage in dataframe
-            df[f'synt{i+1}'] = synt[i]
+    return synthetic_irradiance
 
-            if i == runs-1:
-                # Change numerical index to datetime index
-                df.index = pd.MultiIndex.from_tuples(MULTIINDEX, names=('hour', 'minute'))
+# =============================================================================
+# Quantile
+# =============================================================================
+def quantile(dictionary:dict, year:int, month:int, sky_condition:str, resolution:int, runs:int,
+             seed:int|np.random.SeedSequence|np.random.Generator=None, knots:int=KNOTS, compact:bool=False, float32:bool=False) -> dict:
+    '''
+    Stochastic generation from the empirical distribution of each time: the
+    historical days (the bootstrap data of `utils.analysis`) are reduced to
+    a table of `knots` quantiles per time, and every value is drawn by
+    inverse-CDF interpolation in that table. Unlike the gaussian draws of
+    `stochastic`, values stay inside the historical min/max without piling
+    up at the bounds.
 
-                # Save the synthetic data in irradsyntm1_dict
-                synthetic_irradiance[f'{MONTHS[str(month)]}{year}-{sky_condition}'] = df
+    Random draws follow `seed` as described in `rng.draw`.
+
+    With `compact=True` the values of the dictionary are `SyntheticResult`
+    (in float32 with `float32=True`) instead of pd.DataFrame.
+    '''
+    # Catching exception
+    if sky_condition not in ['sc1', 'sc2', 'sc3', 'sc4', 'sc5']:
+        raise ValueError(f"An invalid sky condition ({sky_condition}) was selected. Select one of ['sc1', 'sc2', 'sc3', 'sc4', 'sc5'].")
+
+    if knots < 2:
+        raise ValueError(f'An invalid quantity of knots ({knots}) was selected. It must be at least 2.')
+
+    # Dictionary
+    synthetic_irradiance = {}
+
+    # Constants
+    MONTHS = {'1': 'Jan', '2': 'Feb', '3': 'Mar', '4': 'Apr', '5': 'May', '6': 'Jun',
+              '7': 'Jul', '8': 'Aug', '9': 'Sep', '10': 'Oct', '11': 'Nov', '12': 'Dec'}
+
+    MULTIINDEX = time_grid(resolution).multiindex
+
+    #Calling the data from irrad_analysis dictionary previously created
+    data = dictionary[sky_condition]
+
+    if data.empty == True:
+        print(f'There is no information related to the date {MONTHS[str(month)]}-{year} {sky_condition}.')
+
+    else:
+        table = quantile_table(matrix=data.to_numpy(dtype=float), knots=knots)
+
+        with profiling.stage('quantile.draw', runs=runs):
+            synt = random_state.draw(kernel=lambda n, rng: _quantile_runs(table=table, runs=n, rng=rng), runs=runs, seed=seed)
+
+        # Synthetic data storage in dataframe
+        with profiling.stage('quantile.frame', runs=runs):
+            if compact == True:
+                df = SyntheticResult(values=synt, resolution=resolution, year=year, month=month, sky_condition=sky_condition, method='quantile', float32=float32)
+
+            else:
+                df = pd.DataFrame(data=synt, index=MULTIINDEX, columns=[f'synt{i+1}' for i in range(runs)])
+
+        # Save the synthetic data in irradsyntm1_dict
+        synthetic_irradiance[f'{MONTHS[str(month)]}{year}-{sky_condition}'] = df
 
     return synthetic_irradiance
 
+# =============================================================================
+# Quantile table
+# =============================================================================
+def quantile_table(matrix:np.ndarray, knots:int=KNOTS) -> np.ndarray:
+    '''
+    Quantiles of each time of a (days x times) matrix at `knots` evenly
+    spaced probabilities from 0 (min) to 1 (max), ignoring NaN values and
+    with 0 for times without data (as the statistics of `utils.analysis`).
+
+    Returns an array of shape (times, knots).
+    '''
+    matrix = np.asarray(matrix, dtype=float)
+    q = np.linspace(0, 1, knots)
+
+    # np.nanquantile works column by column, it is only used for the times with NaN values
+    missing = np.isnan(matrix).any(axis=0)
+
+    table = np.empty((knots, matrix.shape[1]))
+    table[:, ~missing] = np.quantile(matrix[:, ~missing], q=q, axis=0)
+
+    if missing.any() == True:
+        with np.errstate(invalid='ignore'):
+            table[:, missing] = np.nanquantile(matrix[:, missing], q=q, axis=0)
+
+    return np.ascontiguousarray(np.nan_to_num(table.T, nan=0.))
+
 # =============================================================================
 # Clear-sky index (kc)
 # =============================================================================
-def clear_sky_index(data:pd.DataFrame, column:str, longitude:float, latitude:float, altitude:float, time_zone:str) -> pd.DataFrame:
+def clear_sky_index(data:pd.DataFrame, column:str, longitude:float, latitude:float, altitude:float, time_zone:str, cache:bool=False) -> pd.DataFrame:
     '''
+    The clear-sky irradiance is computed at the timestamps of the data, so
+    missing timestamps are allowed. A timezone-aware index is converted to
+    `time_zone`; a naive index is taken as the time elapsed from its first
+    timestamp localized to `time_zone` (i.e. at a fixed UTC offset, as the
+    datasets of validations/data).
+
+    With `cache=True` the clear-sky irradiance is read from (or stored in) the
+    on-disk cache of `src.cache`, keyed by location and time grid.
     '''
-    # Location
-    location = pvlib.location.Location(latitude, longitude, time_zone, altitude)
+    # Constants
+    RESOLUTION = resolution_of(data.index)
+    SECONDS = time_grid(RESOLUTION).seconds
 
-    # Clear-sky irradiance (Hcs)
-    RESOLUTION = int(pd.Series(data.index.values).diff().median().total_seconds()/60)
+    # Timestamps of the data in the time zone
+    if data.index.tz is not None:
+        times = data.index.tz_convert(time_zone)
+
+    else:
+        times = pd.Timestamp(data.index[0]).tz_localize(time_zone) + (data.index - data.index[0])
 
     # Clear-sky irradiance (Hcs)
-    hcs = location.get_clearsky(times=pd.date_range(start=data.index[0],end=data.index[-1], freq=f'{RESOLUTION}min', tz=time_zone),
-                                model='ineichen')
+    with profiling.stage('clear_sky_index.clearsky', rows=len(data), cache=int(cache)):
+        if cache == True:
+            # Steps of each timestamp on the cached time grid from the first one
+            steps = ((times - times[0]).total_seconds().to_numpy() // SECONDS).astype(np.intp)
+
+            hcs = cache_module.clearsky_ghi(latitude=latitude, longitude=longitude, altitude=altitude, time_zone=time_zone,
+                                            start=times[0], end=times[0] + pd.Timedelta(seconds=int(steps[-1])*SECONDS), resolution=RESOLUTION)
+
+            hcs = np.asarray(hcs)[steps]
 
-    # Append clear-sky irradiance to main dataframe
-    data['ics_wm2'] = hcs['ghi'].values
+        else:
+            # Imported here so that the generation methods do not load pvlib
+            import pvlib
 
-    # Clear-sky index (kc) to main dataframe
-    data['kc'] = data[column].values / data['ics_wm2'].values
+            # Location
+            location = pvlib.location.Location(latitude, longitude, time_zone, altitude)
 
-    # NaN
-    data['kc'] = data['kc'].fillna(1)
+            hcs = location.get_clearsky(times=times, model='ineichen')['ghi'].values
 
-    # Replace kc > 1
-    data.loc[data['kc'] > 1, 'kc'] = 1
+    with profiling.stage('clear_sky_index.kc', rows=len(data)):
+        # Append clear-sky irradiance to main dataframe
+        data['ics_wm2'] = hcs
+
+        # Clear-sky index (kc) to main dataframe
+        data['kc'] = data[column].values / data['ics_wm2'].values
+
+        # NaN
+        data['kc'] = data['kc'].fillna(1)
+
+        # Replace kc > 1
+        data.loc[data['kc'] > 1, 'kc'] = 1
 
     return data
 
 # =============================================================================
-# Sequential
+# Stochastic engine
 # =============================================================================
-def sequential(data:pd.DataFrame, irradiance_column:str, year:int, month:int, sky_condition:str,
-               method:str, confidence_interval:float, runs:int) -> pd.DataFrame:
+def _stochastic_runs(mean:np.ndarray, std:np.ndarray, minimum:np.ndarray, maximum:np.ndarray, runs:int, rng:np.random.Generator=None) -> np.ndarray:
     '''
+    Gaussian draws of every time clipped to its historical min/max, for all
+    the runs at once. Draws come from `rng`, or from the global NumPy state
+    when None.
+
+    Returns an array of shape (times, runs).
     '''
-    # Catching exception
-    if sky_condition not in ['sc1', 'sc2', 'sc3', 'sc4', 'sc5']:
-        raise ValueError(f"An invalid sky condition ({sky_condition}) was selected. Select one of ['sc1', 'sc2', 'sc3', 'sc4', 'sc5'].")
+    random = np.random if rng is None else rng
 
-    if method not in ['stochastic', 'bootstrap']:
-        raise ValueError(f"An invalid method ({method}) for synthetic solar irradiance generation was selected. Select one of ['stochastic', 'bootstrap'].")
+    synt = random.normal(loc=mean[:, None], scale=std[:, None], size=(len(mean), runs))
 
-    # Constants
-    RESOLUTION = int(pd.Series(data.index.values).diff().median().total_seconds()/60)
-    TIMES = [f'{i}:0{j}' if j < 10 else f'{i}:{j}' for i in range(0, 24) for j in range(0, 60, RESOLUTION)]
-    MULTIINDEX = [(i,j) for i in range(0, 24) for j in range(0, 60, RESOLUTION)]
+    return np.maximum(np.minimum(synt, maximum[:, None]), minimum[:, None])
+
+# =============================================================================
+# Quantile engine
+# =============================================================================
+def _quantile_runs(table:np.ndarray, runs:int, rng:np.random.Generator=None) -> np.ndarray:
+    '''
+    Inverse-CDF draws of every time from its (times, knots) quantile table,
+    for all the runs at once. Draws come from `rng`, or from the global
+    NumPy state when None.
 
-    # DataFrame filtered by date and between 6:00 to 18:00h range
-    data = data.loc[(data.index.year == year) & (data.index.month == month)]
+    Returns an array of shape (times, runs).
+    '''
+    random = np.random if rng is None else rng
 
-    # Median value of clear-sky index (kc)
-    median_kc = data['kc'].loc[(data.index.hour >= 6) & (data.index.hour < 18)].resample(rule='1d').median()
+    return _inverse_cdf(table=table, uniform=random.random(size=(len(table), runs)))
 
-    # Categorization according to clear-sky index (kc) value
-    if sky_condition == 'sc1':
-        days = np.array(median_kc.loc[median_kc <= 0.2].index.day)
+def _inverse_cdf(table:np.ndarray, uniform:np.ndarray) -> np.ndarray:
+    '''
+    Values of the (times, runs) uniform numbers in [0, 1) through the
+    (times, knots) quantile table, interpolated linearly between knots.
+    `uniform` is overwritten.
+    '''
+    n_times, knots = table.shape
 
-    elif sky_condition == 'sc2':
-        days = np.array(median_kc.loc[(0.2 < median_kc) & (median_kc <= 0.4)].index.day)
+    # Knot below each uniform number and position between it and the next one
+    position = uniform
+    position *= knots - 1
+    lower = position.astype(np.intp)
+    position -= lower
 
-    elif sky_condition == 'sc3':
-        days = np.array(median_kc.loc[(0.4 < median_kc) & (median_kc <= 0.6)].index.day)
+    # Flat positions in the table, row by row, and slope of each knot
+    lower += (np.arange(n_times) * knots)[:, None]
+    slope = np.diff(table, axis=1, append=0).ravel()
 
-    elif sky_condition == 'sc4':
-        days = np.array(median_kc.loc[(0.6 < median_kc) & (median_kc <= 0.67)].index.day)
+    synt = np.take(table.ravel(), lower)
+    synt += position * np.take(slope, lower)
 
-    elif sky_condition == 'sc5':
-        days = np.array(median_kc.loc[median_kc > 0.67].index.day)
+    return synt
 
-    else:
-        raise ValueError(f'An invalid sky condition {sky_condition} was requested.')
+# =============================================================================
+# Bootstrap engine
+# =============================================================================
+def _bootstrap_runs(matrix:np.ndarray, runs:int, rng:np.random.Generator=None) -> np.ndarray:
+    '''
+    Historical days of the (days x times) matrix drawn with replacement, for
+    all the runs at once. Draws come from `rng`, or from the global NumPy
+    state when None.
 
-    if len(days) == 0:
-        df = None
+    Returns an array of shape (times, runs).
+    '''
+    random = np.random if rng is None else rng
 
-    else:
-        aux_data = data[irradiance_column].loc[data.index.day.isin(days)]
+    return matrix[random.choice(matrix.shape[0], runs, replace=True)].T
+
+# =============================================================================
+# Sequential engine
+# =============================================================================
+def _sequential_runs(index:TransitionIndex, method:str, confidence_interval:float, runs:int, rng:np.random.Generator=None,
+                     engine:str='auto') -> np.ndarray:
+    '''
+    Vectorized engine behind `sequential`. All the runs are advanced together
+    one timestep at a time, and the confidence band of each run is looked up
+    in the sorted columns of the transition index, so the statistics of each
+    column are computed once and each step is a few array operations.
+
+    With the 'numba' `engine` (see `kernels.engine`) the bootstrap steps run
+    in the compiled `kernels.bootstrap_band` instead, with the same result.
+
+    Draws come from `rng`, or from the global NumPy state when None.
+
+    Returns an array of shape (times, runs).
+    '''
+    with profiling.stage(f'sequential.steps.{method}', runs=runs, steps=max(index.n_times-1, 0)*runs) as timer:
+        counting = profiling.enabled()
+
+        random = np.random if rng is None else rng
+
+        synt = np.empty((index.n_times, runs))
+
+        # Half-width of the confidence interval for each column (sample std)
+        half_width = index.half_width(confidence_interval=confidence_interval)
+
+        # STEP 1. First timestep from the whole column
+        if method == 'stochastic':
+            synt[0] = random.normal(loc=np.mean(index.matrix[:, 0]), scale=np.std(index.matrix[:, 0]), size=runs)
+
+        else:
+            synt[0] = random.choice(index.matrix[:, 0], size=runs)
+
+            # Compiled bootstrap steps, from the same uniform numbers as the loop below
+            if kernels.engine(engine) == 'numba' and index.n_times > 1:
+                uniform = random.random(size=(index.n_times-1, runs))
 
-        temp_aux_data = pd.DataFrame(aux_data.values.reshape(len(aux_data.index.day.unique()), len(TIMES)), index=list(aux_data.index.day.unique()), columns=TIMES)
+                synt, empty_bands = kernels.bootstrap_band(sorted_values=index.sorted, following=index.following, half_width=half_width, synt=synt, uniform=uniform)
+                timer.add('empty_bands', empty_bands)
 
-        if temp_aux_data.empty != True:
-            ALPHA = 1 - confidence_interval
+                return synt
 
-            # DataFrame to store all the synthetic irradiance before store at dictionary
-            df = pd.DataFrame()
+        for i in range(1, index.n_times):
+            # STEP 2. Days inside the confidence band of each run
+            lo, hi = index.band(time=i-1, lower=synt[i-1] - half_width[i-1], upper=synt[i-1] + half_width[i-1])
 
-            for r in range(runs):
-                synt = []
+            # Empty bands are given the whole column, their draw is discarded
+            empty = lo == hi
+            lo = np.where(empty, 0, lo)
+            hi = np.where(empty, index.n_days, hi)
 
-                for i, j in enumerate(TIMES):
-                    if i == 0:
-                        # STEP 1. Select column from pd.DataFrame
-                        temp = temp_aux_data[j]
+            # STEP 3. Generate a synthetic data per run from the days in the band
+            if method == 'stochastic':
+                mean, std, minimum, maximum = index.moments(time=i-1, lo=lo, hi=hi)
 
-                        # STEP 2. Generate a stochastic synthetic data
-                        if method == 'stochastic':
-                            synt.append(np.random.normal(loc=np.mean(temp), scale=np.std(temp)))
+                s = random.normal(loc=mean, scale=std)
+                s = np.maximum(np.minimum(s, maximum), minimum)
 
-                        else:
-                            synt.append(np.random.choice(temp.values))
+            else:
+                s = index.draw(time=i-1, lo=lo, hi=hi, uniform=random.random(size=runs))
 
-                    else:
-                        # STEP 1. Select column from pd.DataFrame
-                        temp = temp_aux_data[[TIMES[i-1], TIMES[i]]]
+            # STEP 4. Empty band keeps the previous value
+            synt[i] = np.where(empty, synt[i-1], s)
 
-                        # STEP 2. Confidence interval
-                        N = len(temp)
+            if counting == True:
+                timer.add('empty_bands', int(np.count_nonzero(empty)))
 
-                        z = scipy.stats.norm.ppf(confidence_interval+(ALPHA/2)) # Gaussian
-                        std = np.std(temp[TIMES[i-1]], ddof=1) # Sample
+        return synt
 
-                        upper_bound = synt[i-1] + (z * std / np.sqrt(N))
-                        lower_bound = synt[i-1] - (z * std / np.sqrt(N))
+# =============================================================================
+# Sequential
+# =============================================================================
+def sequential(data:pd.DataFrame|TransitionIndex, irradiance_column:str, year:int, month:int, sky_condition:str,
+               method:str, confidence_interval:float, runs:int, seed:int|np.random.SeedSequence|np.random.Generator=None,
+               compact:bool=False, float32:bool=False, engine:str='auto', cache:bool=False) -> pd.DataFrame|SyntheticResult:
+    '''
+    The `data` can be the pd.DataFrame returned by `clear_sky_index` or a
+    `TransitionIndex` previously built for the same (year, month, sky
+    condition), which skips the filtering and categorization of the days.
 
-                        # STEP 3. Interval bounds
-                        if upper_bound >= np.max(temp[TIMES[i-1]].values):
-                            upper_bound = np.max(temp[TIMES[i-1]].values)
+    Random draws follow `seed` as described in `rng.draw`.
 
-                        if lower_bound <= np.min(temp[TIMES[i-1]].values):
-                            lower_bound = np.min(temp[TIMES[i-1]].values)
+    With `compact=True` a `SyntheticResult` (in float32 with `float32=True`)
+    is returned instead of a pd.DataFrame.
 
-                        # STEP 3. Filter pd.DataFrame by confidence interval
-                        temp = temp.loc[(lower_bound <= temp[TIMES[i-1]]) & (temp[TIMES[i-1]] <= upper_bound)]
+    The bootstrap steps run in a compiled kernel when `engine` is 'numba',
+    or 'auto' with numba installed (see `kernels.engine`).
 
-                        # STEP 4. Generate a stochastic synthetic data
-                        if len(temp[TIMES[i]]) == 0:
-                            synt.append(synt[i-1])
+    With `cache=True` the index of the pd.DataFrame is memoized across calls
+    by `transition.cached_index`.
+    '''
+    # Catching exception
+    if sky_condition not in ['sc1', 'sc2', 'sc3', 'sc4', 'sc5']:
+        raise ValueError(f"An invalid sky condition ({sky_condition}) was selected. Select one of ['sc1', 'sc2', 'sc3', 'sc4', 'sc5'].")
 
-                        else:
-                            # Stochastic
-                            if method == 'stochastic':
-                                s = np.random.normal(loc=np.mean(temp[TIMES[i]]), scale=np.std(temp[TIMES[i]]))
+    if method not in ['stochastic', 'bootstrap']:
+        raise ValueError(f"An invalid method ({method}) for synthetic solar irradiance generation was selected. Select one of ['stochastic', 'bootstrap'].")
 
-                                if s >= np.max(temp[TIMES[i]].values):
-                                    s = np.max(temp[TIMES[i]].values)
+    kernels.engine(engine)
 
-                                if s <= np.min(temp[TIMES[i]].values):
-                                    s = np.min(temp[TIMES[i]].values)
+    # Historical days of the (year, month, sky condition)
+    with profiling.stage('sequential.index', cache=int(cache)):
+        if isinstance(data, TransitionIndex):
+            index = data
 
-                                synt.append(s)
+        elif cache == True:
+            index = cached_index(data=data, irradiance_column=irradiance_column, year=year, month=month, sky_condition=sky_condition)
 
-                            # Bootstrap
-                            else:
-                                synt.append(np.random.choice(temp[TIMES[i]].values))
+        else:
+            index = TransitionIndex.from_data(data=data, irradiance_column=irradiance_column, year=year, month=month, sky_condition=sky_condition)
 
-                # Synthetic data storage in dataframe
-                df[f'synt{r+1}'] = synt
+    # Constants
+    RESOLUTION = index.resolution
+    MULTIINDEX = time_grid(RESOLUTION).multiindex
 
-                if r == runs-1:
-                    # Change numerical index to datetime index
-                    df.index = pd.MultiIndex.from_tuples(MULTIINDEX, names=('hour', 'minute'))
+    if index.n_days == 0:
+        df = None
 
-    return df
\ No newline at end of file
+    else:
+        # Generation of all runs at once over the (days x times) matrix
+        synt = random_state.draw(kernel=lambda n, rng: _sequential_runs(index=index, method=method, confidence_interval=confidence_interval, runs=n, rng=rng, engine=engine),
+                                 runs=runs,
+                                 seed=seed)
+
+        # Synthetic data storage in dataframe
+        with profiling.stage('sequential.frame', runs=runs):
+            if compact == True:
+                df = SyntheticResult(values=synt, resolution=RESOLUTION, year=year, month=month, sky_condition=sky_condition, method=method, float32=float32)
+
+            else:
+                df = pd.DataFrame(data=synt,
+                                  index=MULTIINDEX,
+                                  columns=[f'synt{r+1}' for r in range(runs)])
+
+    return df
@@ -1,31 +1,45 @@
 import src
-import pvlib
 import scipy
 import numpy as np
 import pandas as pd
-from sklearn.metrics import mean_squared_error
 
 # =============================================================================
 # Standard deviation of increments (SDI)
 # =============================================================================
-def standard_deviation_increments(data:np.array) -> float:
+def standard_deviation_increments(data:np.array) -> float|np.ndarray:
     '''
+    Accepts a sequence of shape (timesteps,) or a matrix of shape
+    (timesteps, runs), in which case one value per run is returned.
     '''
-    delta = np.array([0 if i == 0 else abs(data[i] - data[i-1]) for i in range(len(data))])
-    return  np.sqrt(np.sum((delta - np.mean(delta))**2) / (len(delta) - 1))
+    delta = _increments(data=data)
+
+    return np.sqrt(np.sum((delta - np.mean(delta, axis=0))**2, axis=0) / (len(delta) - 1))
 
 # =============================================================================
 # Stability index (SI)
 # =============================================================================
-def stability_index(data:np.array, threshold:float=500) -> float:
+def stability_index(data:np.array, threshold:float=500) -> float|np.ndarray:
     '''
+    Accepts a sequence of shape (timesteps,) or a matrix of shape
+    (timesteps, runs), in which case one value per run is returned.
     '''
-    delta = np.array([0 if i == 0 else abs(data[i] - data[i-1]) for i in range(len(data))])
+    delta = _increments(data=data)
 
     delta[delta > threshold] = 1
     delta[delta <= threshold] = 0
 
-    return np.sum(delta)
+    return np.sum(delta, axis=0)
+
+# =============================================================================
+# Increments
+# =============================================================================
+def _increments(data:np.array) -> np.ndarray:
+    '''
+    Absolute increments along the first axis, with a leading zero increment.
+    '''
+    data = np.asarray(data, dtype=float)
+
+    return np.abs(np.diff(data, axis=0, prepend=data[:1]))
 
 # =============================================================================
 # Integrated complementary cumulative distribution function (ICCDF)
@@ -40,16 +54,35 @@ def iccdf(data:np.array) -> float:
 # =============================================================================
 # Variability index (VI)
 # =============================================================================
-def variability_index(timestamps:np.array, ghi:np.array, hcs:np.array) -> pd.Series:
+def variability_index(timestamps:np.array, ghi:np.array, hcs:np.array) -> pd.Series|pd.DataFrame:
+    '''
+    Accepts a `ghi` sequence of shape (timesteps,), or a matrix of shape
+    (timesteps, runs) that returns a pd.DataFrame with one column per run.
+    The clear-sky irradiance `hcs` can be shared by all runs.
+    '''
     dt = int(pd.Series(timestamps).diff().median().total_seconds()/60)
 
-    delta_ghi = np.array([0 if i == 0 else np.sqrt(((ghi[i] - ghi[i-1])**2) + dt**2) for i in range(len(ghi))])
-    delta_hcs = np.array([0 if i == 0 else np.sqrt(((hcs[i] - hcs[i-1])**2) + dt**2) for i in range(len(hcs))])
+    ghi = np.asarray(ghi, dtype=float)
+    hcs = np.asarray(hcs, dtype=float)
+
+    if ghi.ndim > hcs.ndim:
+        hcs = hcs[:, None]
+
+    delta_ghi = np.sqrt(np.diff(ghi, axis=0, prepend=ghi[:1])**2 + dt**2)
+    delta_hcs = np.sqrt(np.diff(hcs, axis=0, prepend=hcs[:1])**2 + dt**2)
+
+    delta_ghi[0] = 0
+    delta_hcs[0] = 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vi = delta_ghi / delta_hcs
 
-    vi = delta_ghi / delta_hcs
     vi[np.isnan(vi)] = 1
 
-    return pd.Series(vi, index=timestamps)
+    if vi.ndim == 1:
+        return pd.Series(vi, index=timestamps)
+
+    return pd.DataFrame(vi, index=timestamps)
 
 # =============================================================================
 # Kolmogorov-Smirnov Test (KS)
@@ -102,42 +135,160 @@ def kullback_leibler_divergence(sample1:np.array, sample2:np.array) -> float:
 # =============================================================================
 # Overlapping coefficient (OVC)
 # =============================================================================
-def overlapping_coefficient(sample1:np.array, sample2:np.array, number_bins:int=100) -> float:
+def overlapping_coefficient(sample1:np.array, sample2:np.array, number_bins:int=100) -> float|np.ndarray:
     '''
     A value of 1 corresponds to a perfect fit between f(x) and g(x)
     and 0 valuecorresponds to totally disjointed densities.
 
+    Samples of shape (samples, runs) give one value per run, and a sample of
+    shape (samples,) can be compared against all the runs of the other.
+
     Source: https://stats.stackexchange.com/questions/267432/coefficient-of-overlapping-ovl-for-two-distributions
     '''
+    sample1 = np.asarray(sample1, dtype=float)
+    sample2 = np.asarray(sample2, dtype=float)
+
+    scalar = sample1.ndim == 1 and sample2.ndim == 1
+    sample1 = sample1.reshape(len(sample1), -1)
+    sample2 = sample2.reshape(len(sample2), -1)
+
     # Determine the range over which the integration will occur
-    min_value = np.min((sample1.min(), sample2.min()))
-    max_value = np.min((sample1.max(), sample2.max()))
+    min_value = np.minimum(sample1.min(axis=0), sample2.min(axis=0))
+    max_value = np.minimum(sample1.max(axis=0), sample2.max(axis=0))
 
     # Determine the bin width
     bin_width = (max_value-min_value)/number_bins
 
-    #For each bin, find min frequency
-    lower_bound = min_value #Lower bound of the first bin is the min_value of both arrays
-    min_arr = np.empty(number_bins) #Array that will collect the min frequency in each bin
+    # Bin bounds, moved bin by bin from the min_value, shape (number_bins+1, runs)
+    bounds = np.cumsum(np.vstack([min_value, np.broadcast_to(bin_width, (number_bins, len(bin_width)))]), axis=0)
+
+    # Share of samples in each bin, shape (number_bins, runs)
+    freq_sample1 = _bin_frequencies(sample=sample1, bounds=bounds)
+    freq_sample2 = _bin_frequencies(sample=sample2, bounds=bounds)
+
+    # Conserve the lower frequency
+    ovc = np.minimum(freq_sample1, freq_sample2).sum(axis=0)
+
+    return ovc[0] if scalar else ovc
+
+# =============================================================================
+# Bin frequencies
+# =============================================================================
+def _bin_frequencies(sample:np.ndarray, bounds:np.ndarray) -> np.ndarray:
+    '''
+    Share of each column of `sample` (samples, runs or 1) in every interval
+    [bounds[b], bounds[b+1]) of its run, shape (bins, runs).
+    '''
+    number_bins, runs = len(bounds) - 1, bounds.shape[1]
+    sample = np.broadcast_to(sample, (len(sample), runs))
+    columns = np.broadcast_to(np.arange(runs), sample.shape)
+
+    # Bin estimate from the width, corrected against the bounds themselves
+    with np.errstate(divide='ignore', invalid='ignore'):
+        b = np.floor((sample - bounds[0]) / (bounds[1] - bounds[0]))
+
+    b = np.clip(np.nan_to_num(b), 0, number_bins-1).astype(int)
+    b = np.clip(b - (sample < bounds[b, columns]), 0, number_bins-1)
+    b = np.clip(b + (sample >= bounds[b+1, columns]), 0, number_bins-1)
 
-    for b in range(number_bins):
-        higher_bound = lower_bound + bin_width #Set the higher bound for the bin
+    valid = (bounds[b, columns] <= sample) & (sample < bounds[b+1, columns])
 
-        #Determine the share of samples in the interval
-        freq_sample1 = np.ma.masked_where((sample1<lower_bound)|(sample1>=higher_bound), sample1).count()/len(sample1)
-        freq_sample2 = np.ma.masked_where((sample2<lower_bound)|(sample2>=higher_bound), sample2).count()/len(sample2)
+    counts = np.bincount((b + number_bins*columns)[valid], minlength=number_bins*runs)
 
-        #Conserve the lower frequency
-        min_arr[b] = np.min((freq_sample1, freq_sample2))
-        lower_bound = higher_bound #To move to the next range
+    return counts.reshape(runs, number_bins).T / len(sample)
 
-    return min_arr.sum()
+# =============================================================================
+# Batch distribution comparison
+# =============================================================================
+def compare_distributions(reference:np.array, synthetic:np.array, number_bins:int=100) -> pd.DataFrame:
+    '''
+    Goodness of fit of every run of `synthetic` (samples, runs) against one
+    `reference` sample, with the values of `kolmogorov_smirnov`,
+    `kullback_leibler_divergence`, `overlapping_coefficient` and `iccdf`
+    called run by run.
+
+    The reference is sorted once and all the runs are sorted, binned and
+    integrated together. The KS p-value is still given by
+    `kolmogorov_smirnov` run by run (runs with the same statistic share a
+    call), so with many runs of continuous values it takes most of the time.
+
+    Returns one row per run with the 'run', 'ks_statistic',
+    'kolmogorov_smirnov', 'kullback_leibler_divergence',
+    'overlapping_coefficient' and 'iccdf' columns. The KLD compares the
+    samples position by position and is NaN when their lengths differ.
+    '''
+    reference = np.asarray(reference, dtype=float)
+    synthetic = np.asarray(synthetic, dtype=float)
+
+    # Catching exception
+    if reference.ndim != 1 or synthetic.ndim not in [1, 2]:
+        raise ValueError(f'Invalid shapes {reference.shape} and {synthetic.shape} were given. The reference must have shape (samples,) and the synthetic data (samples, runs).')
+
+    synthetic = synthetic.reshape(len(synthetic), -1)
+    runs, m, n = synthetic.shape[1], len(reference), len(synthetic)
+
+    # One contiguous row per run, so that each row is reduced as a 1-D sample
+    rows = np.ascontiguousarray(synthetic.T)
+    sorted_rows = np.sort(rows, axis=1)
+    sorted_reference = np.sort(reference)
+
+    # KS statistic (times m*n, as an integer) from the merged ECDFs of each run
+    values = np.concatenate([np.broadcast_to(sorted_reference, (runs, m)), sorted_rows], axis=1)
+    steps = np.concatenate([np.full(m, n), np.full(n, -m)])
+
+    order = np.argsort(values, axis=1, kind='stable')
+    values = np.take_along_axis(values, order, axis=1)
+    ecdf_diff = np.cumsum(steps[order], axis=1)
+
+    # ECDFs are right-continuous, only the last of tied values counts
+    last = np.ones(values.shape, dtype=bool)
+    last[:, :-1] = values[:, 1:] != values[:, :-1]
+    ks_diff = np.where(last, np.abs(ecdf_diff), 0).max(axis=1)
+
+    valid = ~np.isnan(sorted_rows[:, -1]) & ~np.isnan(sorted_reference[-1])
+
+    ks_statistic = np.where(valid, ks_diff / (m*n), np.nan)
+    ks_pvalue = np.full(runs, np.nan)
+
+    # Runs with the same statistic (e.g. from repeated bootstrap days) share their p-value
+    distinct, first, inverse = np.unique(ks_diff[valid], return_index=True, return_inverse=True)
+    valid_rows = rows[valid]
+    pvalues = [kolmogorov_smirnov(sample1=reference, sample2=valid_rows[i]) for i in first]
+    ks_pvalue[valid] = np.asarray(pvalues, dtype=float)[inverse.ravel()]
+
+    # KLD, as scipy.stats.entropy with each run normalized on its own
+    kld = np.full(runs, np.nan)
+
+    if m == n:
+        with np.errstate(invalid='ignore'):
+            pk = reference / np.sum(reference)
+            qk = rows / np.sum(rows, axis=1, keepdims=True)
+
+        kld = np.sum(scipy.special.rel_entr(pk, qk), axis=1)
+        kld[kld == np.inf] = 1
+
+    # OVC, bin bounds depend on the range of each run
+    ovc = overlapping_coefficient(sample1=reference, sample2=synthetic, number_bins=number_bins)
+
+    # ICCDF of each run, from the sorted samples
+    y = 1. * np.arange(n) / (n - 1)
+    integrated = scipy.integrate.simpson(x=sorted_rows, y=np.broadcast_to(1-y, sorted_rows.shape), axis=1)
+
+    return pd.DataFrame({'run': np.arange(runs),
+                         'ks_statistic': ks_statistic,
+                         'kolmogorov_smirnov': ks_pvalue,
+                         'kullback_leibler_divergence': kld,
+                         'overlapping_coefficient': ovc,
+                         'iccdf': integrated})
 
 # =============================================================================
 # Root mean squared error (RMSE)
 # =============================================================================
 def root_mean_squared_error(target:np.array, predicted:np.array, percentage:bool=False):
-    rmse = mean_squared_error(y_true=target, y_pred=predicted, squared=False)
+    # Imported here, scikit-learn is only needed by this metric
+    from sklearn.metrics import mean_squared_error
+
+    rmse = np.sqrt(mean_squared_error(y_true=target, y_pred=predicted))
 
     if percentage == True:
         rmse = (rmse / np.max(target)) * 100
@@ -171,10 +322,27 @@ def median_absolute_percentage_error(target:np.array, predicted:np.array) -> flo
 # =============================================================================
 # Energy production
 # =============================================================================
-def energy(irradiance:np.array, tmod:np.array, resolution:int, inverter:dict, module:dict, mps:int, spi:int, loss:float) -> float:
-    # STEP 1. DC production (I-V curve)
-    IL, I0, Rs, Rsh, nNsVth = pvlib.pvsystem.calcparams_cec(effective_irradiance=irradiance,
-                                                            temp_cell=tmod,
+def energy(irradiance:np.array, tmod:np.array, resolution:int, inverter:dict, module:dict, mps:int, spi:int, loss:float) -> float|np.ndarray:
+    '''
+    Energy of an irradiance sequence of shape (timesteps,), or of every run
+    of a matrix of shape (timesteps, runs) in one pass. The module
+    temperature `tmod` is shared by all runs with shape (timesteps,), or
+    given per run with the shape of `irradiance`.
+    '''
+    irradiance = np.asarray(irradiance, dtype=float)
+    tmod = np.asarray(tmod, dtype=float)
+
+    if irradiance.ndim > tmod.ndim:
+        tmod = tmod[:, None]
+
+    tmod = np.broadcast_to(tmod, irradiance.shape)
+
+    # Imported here so that the other metrics do not load pvlib
+    import pvlib
+
+    # STEP 1. DC production (maximum power point only, no I-V curve points)
+    IL, I0, Rs, Rsh, nNsVth = pvlib.pvsystem.calcparams_cec(effective_irradiance=irradiance.ravel(),
+                                                            temp_cell=tmod.ravel(),
                                                             alpha_sc=module['alpha_sc'],
                                                             a_ref=module['a_ref'],
                                                             I_L_ref=module['I_L_ref'],
@@ -190,33 +358,22 @@ def energy(irradiance:np.array, tmod:np.array, resolution:int, inverter:dict, mo
                                               resistance_series=Rs,
                                               resistance_shunt=Rsh,
                                               nNsVth=nNsVth,
-                                              ivcurve_pnts=100,
                                               method='lambertw')
 
-    iv_curve = pd.DataFrame({'i_sc': single_diode['i_sc'],
-                             'v_oc': single_diode['v_oc'],
-                             'i_mp': single_diode['i_mp'],
-                             'v_mp': single_diode['v_mp'],
-                             'p_mp': single_diode['p_mp'],
-                             'i_x': single_diode['i_x'],
-                             'i_xx': single_diode['i_xx']})
-
     # STEP 2. Scaling DC production
-    dc = pd.DataFrame({'i_mp': iv_curve['i_mp'] * spi,
-                       'v_mp': iv_curve['v_mp'] * mps,
-                       'p_mp': iv_curve['p_mp'] * spi * mps})
+    v_dc = np.asarray(single_diode['v_mp']) * mps
+    p_dc = np.asarray(single_diode['p_mp']) * spi * mps
 
     # STEP 3. DC losses
     losses = loss / 100
 
-    dc['i_mp'] = dc['i_mp'] - dc['i_mp']*losses
-    dc['p_mp'] = dc['p_mp'] - dc['p_mp']*losses
+    p_dc = p_dc - p_dc*losses
 
     # STEP 4. AC production
-    ac = pvlib.inverter.sandia(v_dc=dc['v_mp'], p_dc=dc['p_mp'], inverter=inverter)
+    ac = np.asarray(pvlib.inverter.sandia(v_dc=v_dc, p_dc=p_dc, inverter=inverter), dtype=float).reshape(irradiance.shape)
     ac[ac < 0] = 0
 
-    # STEP 5. Acumulated energy
+    # STEP 5. Acumulated energy (NaN steps are skipped)
     min_to_hour = resolution/60
 
-    return np.sum(ac * min_to_hour)
\ No newline at end of file
+    return np.nansum(ac * min_to_hour, axis=0)
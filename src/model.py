@@ -0,0 +1,385 @@
+import numpy as np
+import pandas as pd
+
+from src import kernels
+from src import methods
+from src import profiling
+from src import rng as random_state
+from src import utils
+from src.archive import DayArchive
+from src.grid import fill_days, resolution_of, time_grid
+from src.result import SyntheticResult
+from src.transition import TransitionIndex
+
+# Constants
+SKY_CONDITIONS = ['sc1', 'sc2', 'sc3', 'sc4', 'sc5']
+METHODS = ['stochastic', 'bootstrap']
+
+# Methods of the one-step (non-sequential) generation
+SAMPLERS = METHODS + ['quantile']
+
+
+# =============================================================================
+# Synthetic irradiance model
+# =============================================================================
+class SyntheticIrradianceModel:
+    '''
+    Fit-once / sample-many model of the one-day synthetic irradiance methods.
+
+    `fit` categorizes the days of a (year, month) by sky condition and keeps,
+    for each sky condition, the (days x times) matrix of historical irradiance
+    (inside a `TransitionIndex`), the per-time mean, std, min and max used
+    by the stochastic method and the per-time quantile table of the quantile
+    method. `sample` then draws runs straight from these
+    arrays, so repeated sampling pays the fitting cost only once, and
+    `update` adds newly measured days without fitting again.
+
+    Example
+    ---
+    model = SyntheticIrradianceModel().fit(df=df, irradiance_column='ghi_wm2', year=2023, month=1)
+    synt = model.sample(sky_condition='sc5', runs=1000, method='bootstrap', seed=42)
+    '''
+    __slots__ = ('irradiance_column', 'year', 'month', 'resolution', 'indexes', 'statistics', 'moments', 'quantiles')
+
+    def __init__(self):
+        self.irradiance_column = None
+        self.year = None
+        self.month = None
+        self.resolution = None
+
+        # One TransitionIndex per sky condition
+        self.indexes = None
+
+        # Per sky condition and time: mean, std, min and max, shape (5, 4, times)
+        self.statistics = None
+
+        # Per sky condition and time: days with data, mean and sum of squared deviations (Welford), shape (5, 3, times)
+        self.moments = None
+
+        # Per sky condition and time: quantiles at `methods.KNOTS` probabilities, shape (5, times, knots)
+        self.quantiles = None
+
+    def fit(self, df:pd.DataFrame, irradiance_column:str, year:int, month:int) -> 'SyntheticIrradianceModel':
+        '''
+        Fit the model to a pd.DataFrame with the irradiance and clear-sky
+        index (kc) columns, as returned by `methods.clear_sky_index`.
+        '''
+        # Constants
+        RESOLUTION = resolution_of(df.index)
+
+        # Catching exception
+        if not ((df.index.year == year) & (df.index.month == month)).any():
+            raise ValueError(f'There is no information related to the date {month}-{year}.')
+
+        with profiling.stage('model.fit', rows=len(df)):
+            # Single-pass analysis of the five sky conditions
+            aux_irradiance = utils.analysis(df=df, year=year, month=month, irradiance_column=irradiance_column, resolution=RESOLUTION, plot=False)
+
+            # Historical days of each sky condition
+            self._fit_indexes(indexes=[TransitionIndex(matrix=aux_irradiance['bootstrap'][sc].to_numpy(dtype=float), resolution=RESOLUTION,
+                                                       days=np.array(aux_irradiance['bootstrap'][sc].index)) for sc in SKY_CONDITIONS])
+
+        self.irradiance_column = irradiance_column
+        self.year = year
+        self.month = month
+        self.resolution = RESOLUTION
+
+        return self
+
+    def fit_pooled(self, archive:DayArchive, month:int=None, day_of_year:int=None, window:int=15, years:list=None) -> 'SyntheticIrradianceModel':
+        '''
+        Fit the model to the days of a `DayArchive` pooled across
+        years: all the days of `month`, or the days within ±`window` days of
+        `day_of_year`, of every year (or of `years`). Pooling gives more
+        historical days to the sky conditions that are rare in a single
+        month. Models fitted this way cannot be updated with `update`.
+        '''
+        # Catching exception
+        if archive.n_days == 0:
+            raise ValueError('There are no whole days in the archive.')
+
+        with profiling.stage('model.fit', rows=archive.n_days):
+            self._fit_indexes(indexes=[archive.transition_index(sky_condition=sc, month=month, day_of_year=day_of_year, window=window, years=years)
+                                       for sc in SKY_CONDITIONS])
+
+        if self.n_days.sum() == 0:
+            raise ValueError(f'There are no labelled days in the archive for the selected month ({month}) or day of the year ({day_of_year}).')
+
+        self.irradiance_column = archive.irradiance_column
+        self.year = None
+        self.month = month if month is not None else int((pd.Timestamp('2001-01-01') + pd.Timedelta(days=day_of_year-1)).month)
+        self.resolution = archive.resolution
+
+        return self
+
+    def _fit_indexes(self, indexes:list) -> None:
+        '''
+        Statistics (as in `utils.analysis`), Welford moments and quantile
+        table of each sky condition from its `TransitionIndex`.
+        '''
+        n_times = indexes[0].n_times
+
+        self.indexes = tuple(indexes)
+        self.statistics = np.zeros((len(SKY_CONDITIONS), 4, n_times))
+        self.moments = np.zeros((len(SKY_CONDITIONS), 3, n_times))
+        self.quantiles = np.zeros((len(SKY_CONDITIONS), n_times, methods.KNOTS))
+
+        for i, index in enumerate(self.indexes):
+            if index.n_days > 0:
+                # Row-major days, reduced in the same order as in `utils.analysis`
+                matrix = np.ascontiguousarray(index.matrix)
+
+                self.statistics[i] = utils.day_statistics(matrix=matrix)
+                self.moments[i] = [np.sum(~np.isnan(matrix), axis=0), self.statistics[i, 0], np.nansum((matrix - self.statistics[i, 0])**2, axis=0)]
+                self.quantiles[i] = methods.quantile_table(matrix=matrix)
+
+    def update(self, df:pd.DataFrame, longitude:float=None, latitude:float=None, altitude:float=None, time_zone:str=None,
+               cache:bool=False) -> 'SyntheticIrradianceModel':
+        '''
+        Add newly measured days of the fitted (year, month) to the model,
+        without fitting it again on the whole history. The new days do not
+        need to be consecutive (e.g. after a station outage), and times
+        without data are filled from the other times of their day (see
+        `grid.fill_days`), as in `fit`.
+
+        The clear-sky index (kc) is only computed for the new rows (with the
+        location arguments of `methods.clear_sky_index`, unless `df` already
+        has a 'kc' column). Each day is labelled by sky condition and added
+        to the day matrix of its sky condition, and the mean, std, min and
+        max of each time are updated with Welford's algorithm, so the cost
+        depends on the new days only. The result equals a new `fit` on the
+        whole month up to rounding.
+        '''
+        # Catching exception
+        if self.indexes is None:
+            raise ValueError('The model must be fitted before updating. Call `fit` first.')
+
+        if self.year is None:
+            raise ValueError('Models fitted with `fit_pooled` cannot be updated. Build a new `DayArchive` and fit again.')
+
+        if not ((df.index.year == self.year) & (df.index.month == self.month)).all():
+            raise ValueError(f'The new data must only contain days of the fitted date {self.month}-{self.year}.')
+
+        if df.index.is_monotonic_increasing == False:
+            raise ValueError('The new data must be sorted by timestamp.')
+
+        new_days = np.unique(df.index.day)
+        known = np.isin(new_days, np.concatenate([index.days for index in self.indexes]))
+
+        if known.any():
+            raise ValueError(f'The days {new_days[known].tolist()} of {self.month}-{self.year} are already in the model.')
+
+        with profiling.stage('model.update', rows=len(df), days=len(new_days)):
+            # Clear-sky index (kc) of the new rows only
+            if 'kc' not in df.columns:
+                if None in [longitude, latitude, altitude, time_zone]:
+                    raise ValueError("The new data has no 'kc' column. Give the longitude, latitude, altitude and time_zone of the site.")
+
+                df = methods.clear_sky_index(data=df.copy(), column=self.irradiance_column, longitude=longitude, latitude=latitude,
+                                             altitude=altitude, time_zone=time_zone, cache=cache)
+
+            # New days on the time grid and their sky condition
+            matrix, dates = time_grid(self.resolution).align(df[self.irradiance_column])
+
+            matrix = fill_days(matrix[np.isin(dates.day, new_days)])
+            labels = utils.sky_condition_labels(data=df).reindex(dates[np.isin(dates.day, new_days)], fill_value=0).to_numpy()
+
+            indexes = list(self.indexes)
+
+            for i in range(len(SKY_CONDITIONS)):
+                rows = labels == i+1
+
+                if rows.any() == False:
+                    continue
+
+                for values in matrix[rows]:
+                    self._accumulate(sky=i, values=values)
+
+                # Day matrix in the order of the days of the month, as given by `fit`
+                days = np.concatenate([indexes[i].days, new_days[rows]])
+                order = np.argsort(days, kind='stable')
+
+                indexes[i] = TransitionIndex(matrix=np.vstack([indexes[i].matrix, matrix[rows]])[order], resolution=self.resolution, days=days[order])
+                self.quantiles[i] = methods.quantile_table(matrix=indexes[i].matrix)
+
+        self.indexes = tuple(indexes)
+
+        return self
+
+    def _accumulate(self, sky:int, values:np.ndarray) -> None:
+        '''
+        Welford update of the moments and statistics of a sky condition with
+        the values of one day (NaN values are skipped, as in `utils.analysis`).
+        '''
+        count, mean, squares = self.moments[sky]
+        minimum, maximum = self.statistics[sky, 2], self.statistics[sky, 3]
+
+        valid = ~np.isnan(values)
+        first = valid & (count == 0)
+
+        count[valid] += 1
+        delta = values[valid] - mean[valid]
+        mean[valid] += delta / count[valid]
+        squares[valid] += delta * (values[valid] - mean[valid])
+
+        minimum[first], maximum[first] = values[first], values[first]
+        minimum[valid] = np.fmin(minimum[valid], values[valid])
+        maximum[valid] = np.fmax(maximum[valid], values[valid])
+
+        # Mean and sample std, zero where undefined
+        self.statistics[sky, 0] = mean
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.statistics[sky, 1] = np.where(count > 1, np.sqrt(squares / (count - 1)), 0)
+
+    @property
+    def n_days(self) -> np.ndarray:
+        '''
+        Quantity of historical days per sky condition.
+        '''
+        return np.array([index.n_days for index in self.indexes])
+
+    @property
+    def multiindex(self) -> pd.MultiIndex:
+        '''
+        (hour, minute) index of the generated sequences.
+        '''
+        return time_grid(self.resolution).multiindex
+
+    def sample(self, sky_condition:str, runs:int, method:str='bootstrap', seed:int|np.random.SeedSequence|np.random.Generator=None,
+               sequential:bool=True, confidence_interval:float=0.95, offset:int=0, block_size:int=random_state.BLOCK_SIZE,
+               compact:bool=False, float32:bool=False, engine:str='auto') -> np.ndarray|SyntheticResult:
+        '''
+        Generate `runs` one-day synthetic sequences of a sky condition.
+
+        With `sequential=True` the sequential method of the paper is used
+        (as `methods.sequential`), otherwise the one-step stochastic,
+        bootstrap or quantile method (as `methods.stochastic`,
+        `methods.bootstrap` and `methods.quantile`).
+
+        The sequential bootstrap steps run in a compiled kernel when `engine`
+        is 'numba', or 'auto' with numba installed (see `kernels.engine`).
+
+        Random draws follow `seed` as described in `rng.draw`. With an integer
+        seed, the runs [offset, offset+runs) of a larger generation can be
+        produced on their own, e.g. by the workers given by `rng.split`.
+
+        Returns an array of shape (times, runs), or a `SyntheticResult` with
+        `compact=True` (in float32 with `float32=True`), or None when the sky
+        condition has no historical days.
+        '''
+        # Catching exception
+        if self.indexes is None:
+            raise ValueError('The model must be fitted before sampling. Call `fit` first.')
+
+        if sky_condition not in SKY_CONDITIONS:
+            raise ValueError(f"An invalid sky condition ({sky_condition}) was selected. Select one of ['sc1', 'sc2', 'sc3', 'sc4', 'sc5'].")
+
+        if method not in (METHODS if sequential == True else SAMPLERS):
+            raise ValueError(f"An invalid method ({method}) for synthetic solar irradiance generation was selected. Select one of {METHODS if sequential == True else SAMPLERS}.")
+
+        kernels.engine(engine)
+
+        sky = SKY_CONDITIONS.index(sky_condition)
+        index = self.indexes[sky]
+
+        if index.n_days == 0:
+            return None
+
+        if sequential == True:
+            def kernel(n, rng):
+                return methods._sequential_runs(index=index, method=method, confidence_interval=confidence_interval, runs=n, rng=rng, engine=engine)
+
+        elif method == 'quantile':
+            def kernel(n, rng):
+                return methods._quantile_runs(table=self.quantiles[sky], runs=n, rng=rng)
+
+        elif method == 'stochastic':
+            def kernel(n, rng):
+                mean, std, minimum, maximum = self.statistics[sky]
+
+                return methods._stochastic_runs(mean=mean, std=std, minimum=minimum, maximum=maximum, runs=n, rng=rng)
+
+        else:
+            def kernel(n, rng):
+                return methods._bootstrap_runs(matrix=index.matrix, runs=n, rng=rng)
+
+        with profiling.stage('model.sample', runs=runs):
+            synt = random_state.draw(kernel=kernel, runs=runs, seed=seed, offset=offset, block_size=block_size)
+
+        if compact == True:
+            return SyntheticResult(values=synt, resolution=self.resolution, year=self.year, month=self.month, sky_condition=sky_condition,
+                                   method=method, float32=float32)
+
+        return synt
+
+# =============================================================================
+# Conditional generation of many (month, sky condition) requests
+# =============================================================================
+def sample_conditions(df:pd.DataFrame, irradiance_column:str, year:int, requests:list, method:str='bootstrap',
+                      seed:int|np.random.SeedSequence=None, sequential:bool=True, confidence_interval:float=0.95,
+                      float32:bool=False, engine:str='auto') -> tuple:
+    '''
+    Generate many (month, sky condition, runs) requests of one year in a
+    single call, e.g. `itertools.product(range(1, 13), SKY_CONDITIONS, [100])`.
+
+    The days of the year are labelled and placed on the time grid once (in
+    a `DayArchive`), and each month is fitted once and shared by all its
+    requests. Each request draws from its own child of the root `seed`,
+    given by its position in `requests`, as in `batch.run`.
+
+    Returns the runs of all the requests stacked in one (times, runs) array
+    and a pd.DataFrame with one row per request: its 'month',
+    'sky_condition' and 'runs', the columns [start, stop) of its runs in the
+    array and the quantity of historical days 'n_days'. Requests without
+    historical days are left as NaN.
+    '''
+    requests = [(int(month), sky_condition, int(runs)) for month, sky_condition, runs in requests]
+
+    # Catching exception
+    for month, sky_condition, runs in requests:
+        if sky_condition not in SKY_CONDITIONS:
+            raise ValueError(f"An invalid sky condition ({sky_condition}) was selected. Select one of ['sc1', 'sc2', 'sc3', 'sc4', 'sc5'].")
+
+        if month not in range(1, 13):
+            raise ValueError(f'An invalid month ({month}) was selected. It must be between 1 and 12.')
+
+    if method not in (METHODS if sequential == True else SAMPLERS):
+        raise ValueError(f"An invalid method ({method}) for synthetic solar irradiance generation was selected. Select one of {METHODS if sequential == True else SAMPLERS}.")
+
+    data = df.loc[df.index.year == year, [irradiance_column, 'kc']]
+
+    if data.empty == True:
+        raise ValueError(f'There is no information related to the year {year}.')
+
+    # Label index of the stacked runs
+    labels = pd.DataFrame(requests, columns=['month', 'sky_condition', 'runs'])
+    labels['stop'] = labels['runs'].cumsum()
+    labels.insert(3, 'start', labels['stop'] - labels['runs'])
+
+    root = random_state.seed_sequence(seed)
+
+    with profiling.stage('model.sample_conditions', requests=len(requests), runs=int(labels['runs'].sum())):
+        archive = DayArchive(data=data, irradiance_column=irradiance_column)
+
+        synt = np.full((time_grid(archive.resolution).n_times, int(labels['runs'].sum())), np.nan, dtype=np.float32 if float32 == True else float)
+
+        # One model per month of the requests
+        models = {month: SyntheticIrradianceModel().fit_pooled(archive=archive, month=month, years=[year])
+                  for month in labels['month'].unique() if ((archive.months == month) & (archive.labels > 0)).any()}
+
+        n_days = np.zeros(len(requests), dtype=int)
+
+        for n, (month, sky_condition, runs, start, stop) in enumerate(labels[['month', 'sky_condition', 'runs', 'start', 'stop']].itertuples(index=False)):
+            if month in models:
+                n_days[n] = models[month].n_days[SKY_CONDITIONS.index(sky_condition)]
+
+            if n_days[n] == 0:
+                continue
+
+            synt[:, start:stop] = models[month].sample(sky_condition=sky_condition, runs=runs, method=method, seed=random_state.block_seed(seed=root, block=n),
+                                                       sequential=sequential, confidence_interval=confidence_interval, engine=engine)
+
+    labels['n_days'] = n_days
+
+    return synt, labels
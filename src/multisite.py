@@ -0,0 +1,266 @@
+import numpy as np
+
+from src import profiling
+from src import rng as random_state
+from src.archive import DayArchive, SKY_CONDITIONS
+from src.grid import fill_days
+from src.methods import KNOTS, _inverse_cdf, quantile_table
+
+# Constants
+METHODS = ['bootstrap', 'copula']
+
+
+# =============================================================================
+# Multi-site model
+# =============================================================================
+class MultiSiteModel:
+    '''
+    Joint generator of one-day sequences at several nearby sites, whose
+    cloudiness is correlated.
+
+    `fit` places every site on the time grid (see `archive.DayArchive`) and
+    keeps the days of the (year, month) that are labelled at all the sites,
+    in a (sites x days x times) array. `sample` then draws every run for all
+    the sites at once, as a (sites x timesteps x runs) array:
+
+    - 'bootstrap': one historical day per run, shared by all the sites, so
+      the sky conditions and the irradiance of the sites keep the joint
+      behaviour observed that day.
+    - 'copula': every time is drawn from the quantile table of each site
+      (see `methods.quantile`), with the uniform numbers of the sites tied
+      by a gaussian copula whose correlation is estimated from the normal
+      scores of the daily mean irradiance of the sites.
+
+    Example
+    ---
+    model = MultiSiteModel().fit(data={'madrid': df1, 'seville': df2}, irradiance_column='ghi_wm2', year=2019, month=6)
+    synthetic = model.sample(runs=1000, seed=42)   # (sites, timesteps, runs)
+    '''
+    __slots__ = ('sites', 'irradiance_column', 'year', 'month', 'resolution', 'dates', 'labels', 'matrix')
+
+    def __init__(self):
+        self.sites = None
+        self.irradiance_column = None
+        self.year = None
+        self.month = None
+        self.resolution = None
+        self.dates = None
+        self.labels = None
+        self.matrix = None
+
+    # =========================================================================
+    # Fit
+    # =========================================================================
+    def fit(self, data:dict, irradiance_column:str, year:int, month:int, limit:int=0) -> 'MultiSiteModel':
+        '''
+        Fit the model on a dictionary {site: pd.DataFrame} of datasets with
+        the irradiance and clear-sky index (kc) columns, as returned by
+        `methods.clear_sky_index`, at the same resolution. Gaps of up to
+        `limit` times are interpolated across days (see `grid.fill_gaps`),
+        and the remaining ones from the other times of each day (see
+        `grid.fill_days`).
+        '''
+        # Catching exception
+        if len(data) == 0:
+            raise ValueError('No site was given. Give a dictionary {site: pd.DataFrame} with at least one dataset.')
+
+        with profiling.stage('multisite.fit', sites=len(data)) as timer:
+            archives = {}
+
+            for site, df in data.items():
+                df = df.loc[(df.index.year == year) & (df.index.month == month)]
+
+                # Catching exception
+                if len(df) == 0:
+                    raise ValueError(f'The site {site} has no data in the selected year ({year}) and month ({month}).')
+
+                archives[site] = DayArchive(data=df, irradiance_column=irradiance_column, limit=limit)
+
+            resolutions = {archive.resolution for archive in archives.values()}
+
+            # Catching exception
+            if len(resolutions) > 1:
+                raise ValueError(f'The sites have different resolutions ({sorted(resolutions)} min). Resample them to a common resolution.')
+
+            # Days labelled at every site
+            dates = None
+
+            for archive in archives.values():
+                labelled = archive.dates[archive.labels > 0]
+                dates = labelled if dates is None else dates.intersection(labelled)
+
+            # Catching exception
+            if len(dates) == 0:
+                raise ValueError(f'The sites have no common day with a sky condition in the selected year ({year}) and month ({month}).')
+
+            positions = [archive.dates.get_indexer(dates) for archive in archives.values()]
+
+            # Gaps of each day filled, so the shared days drawn by 'bootstrap' are complete at every site
+            self.matrix = np.stack([fill_days(archive.matrix[k]) for archive, k in zip(archives.values(), positions)])
+            self.labels = np.stack([archive.labels[k] for archive, k in zip(archives.values(), positions)])
+
+            timer.add('days', len(dates))
+
+        self.sites = list(archives)
+        self.irradiance_column = irradiance_column
+        self.year = year
+        self.month = month
+        self.resolution = resolutions.pop()
+        self.dates = dates
+
+        return self
+
+    @property
+    def n_sites(self) -> int:
+        return len(self.sites)
+
+    @property
+    def n_days(self) -> int:
+        return len(self.dates)
+
+    def days(self, sky_condition:str=None, reference:str=None) -> np.ndarray:
+        '''
+        Positions of the common days with a sky condition at the `reference`
+        site (the first site if None), or of all the common days if
+        `sky_condition` is None.
+        '''
+        self._check_fitted()
+
+        if sky_condition is None:
+            return np.arange(self.n_days)
+
+        # Catching exception
+        if sky_condition not in SKY_CONDITIONS:
+            raise ValueError(f"An invalid sky condition ({sky_condition}) was selected. Select one of ['sc1', 'sc2', 'sc3', 'sc4', 'sc5'].")
+
+        site = self.sites[0] if reference is None else reference
+
+        # Catching exception
+        if site not in self.sites:
+            raise ValueError(f'An invalid reference site ({site}) was selected. Select one of {self.sites}.')
+
+        return np.flatnonzero(self.labels[self.sites.index(site)] == int(sky_condition[-1]))
+
+    def correlation(self, days:np.ndarray=None) -> np.ndarray:
+        '''
+        (sites x sites) correlation of the normal scores of the daily mean
+        irradiance of the sites, over the positions `days` (all the common
+        days if None). The identity is returned with less than 3 days.
+        '''
+        from scipy.special import ndtri
+        from scipy.stats import rankdata
+
+        self._check_fitted()
+
+        days = np.arange(self.n_days) if days is None else days
+
+        if len(days) < 3:
+            return np.eye(self.n_sites)
+
+        with np.errstate(invalid='ignore'):
+            daily = np.nanmean(self.matrix[:, days], axis=2)
+
+        scores = ndtri(rankdata(daily, axis=1) / (len(days) + 1))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = np.corrcoef(scores) if self.n_sites > 1 else np.ones((1, 1))
+
+        # Sites without variation (or without data) are left uncorrelated
+        correlation = np.nan_to_num(np.atleast_2d(correlation), nan=0.)
+        np.fill_diagonal(correlation, 1.)
+
+        return correlation
+
+    # =========================================================================
+    # Sample
+    # =========================================================================
+    def sample(self, runs:int, sky_condition:str=None, reference:str=None, method:str='bootstrap',
+               seed:int|np.random.SeedSequence=None, correlation:np.ndarray=None, knots:int=KNOTS) -> np.ndarray:
+        '''
+        Draw `runs` one-day sequences for all the sites at once, from the
+        common days with a sky condition at the `reference` site (see
+        `days`), or from all the common days if `sky_condition` is None (so
+        the sky conditions of the sites are drawn jointly too). For the
+        'copula' method, `correlation` replaces the estimated (sites x sites)
+        correlation (see `correlation`).
+
+        Returns an array of shape (sites, timesteps, runs). With an int or
+        np.random.SeedSequence `seed`, the runs are drawn in blocks as in
+        `random_state.draw`.
+        '''
+        self._check_fitted()
+
+        # Catching exception
+        if method not in METHODS:
+            raise ValueError(f'An invalid method ({method}) was selected. Select one of {METHODS}.')
+
+        days = self.days(sky_condition=sky_condition, reference=reference)
+
+        # Catching exception
+        if len(days) == 0:
+            raise ValueError(f'There is no common day of the sky condition {sky_condition} at the reference site.')
+
+        n_times = self.matrix.shape[2]
+
+        with profiling.stage(f'multisite.{method}', sites=self.n_sites, runs=runs, days=len(days)):
+            if method == 'bootstrap':
+                # (sites x times) rows of the days, one day per run
+                rows = self.matrix.transpose(0, 2, 1)[:, :, days].reshape(-1, len(days))
+
+                def kernel(n:int, rng:np.random.Generator) -> np.ndarray:
+                    random = np.random if rng is None else rng
+
+                    return np.take(rows, random.choice(len(days), n, replace=True), axis=1)
+
+            else:
+                correlation = self.correlation(days=days) if correlation is None else np.asarray(correlation, dtype=float)
+
+                # Catching exception
+                if correlation.shape != (self.n_sites, self.n_sites):
+                    raise ValueError(f'An invalid correlation of shape {correlation.shape} was given. It must be ({self.n_sites}, {self.n_sites}).')
+
+                cholesky = _cholesky(correlation)
+                table = np.concatenate([quantile_table(matrix=self.matrix[s, days], knots=knots) for s in range(self.n_sites)])
+
+                def kernel(n:int, rng:np.random.Generator) -> np.ndarray:
+                    from scipy.special import ndtr
+
+                    random = np.random if rng is None else rng
+
+                    # Correlated normal scores of the sites for every (time, run)
+                    scores = cholesky @ random.standard_normal(size=(self.n_sites, n_times*n))
+
+                    uniform = ndtr(scores).reshape(self.n_sites*n_times, n)
+                    np.minimum(uniform, np.nextafter(1., 0.), out=uniform)
+
+                    return _inverse_cdf(table=table, uniform=uniform)
+
+            synt = random_state.draw(kernel=kernel, runs=runs, seed=seed)
+
+        return synt.reshape(self.n_sites, n_times, runs)
+
+    def _check_fitted(self):
+        # Catching exception
+        if self.matrix is None:
+            raise ValueError('The model is not fitted. Call `fit` first.')
+
+# =============================================================================
+# Utils
+# =============================================================================
+def _cholesky(correlation:np.ndarray) -> np.ndarray:
+    '''
+    Lower Cholesky factor of a correlation matrix. A matrix that is not
+    positive definite (e.g. estimated from fewer days than sites) is first
+    made so by clipping its eigenvalues and rescaling it to unit diagonal.
+    '''
+    try:
+        return np.linalg.cholesky(correlation)
+
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(correlation)
+        matrix = (vectors * np.maximum(values, 1e-10)) @ vectors.T
+
+        scale = np.sqrt(np.diag(matrix))
+        matrix /= np.outer(scale, scale)
+
+        return np.linalg.cholesky(matrix)
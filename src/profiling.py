@@ -0,0 +1,165 @@
+import contextlib
+import logging
+import time
+from collections.abc import Callable, Iterator
+
+import pandas as pd
+
+# Active recorders and open stages of the current process, see `instrument`
+_RECORDERS = []
+_STAGES = []
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Recorder
+# =============================================================================
+class Recorder:
+    '''
+    Records of the stages run inside an `instrument` block. Each record is a
+    dictionary with the stage name, its wall time in seconds, its nesting
+    depth and its counters (e.g. 'rows', 'runs', 'steps', 'empty_bands').
+    '''
+    __slots__ = ('records', 'callback')
+
+    def __init__(self, callback:Callable=None):
+        self.records = []
+        self.callback = callback
+
+    def _add(self, record:dict) -> None:
+        self.records.append(record)
+
+        if self.callback is not None:
+            self.callback(record)
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        One row per record, in the order the stages finished.
+        '''
+        return pd.DataFrame.from_records(self.records)
+
+    def summary(self) -> pd.DataFrame:
+        '''
+        Calls, total and mean seconds and summed counters per stage, sorted
+        by total time.
+        '''
+        df = self.to_frame()
+
+        if df.empty == True:
+            return pd.DataFrame(columns=['calls', 'seconds', 'mean_seconds'])
+
+        counters = [c for c in df.columns if c not in ['stage', 'seconds', 'depth']]
+
+        summary = df.groupby('stage').agg(calls=('seconds', 'size'), seconds=('seconds', 'sum'), **{c: (c, 'sum') for c in counters})
+        summary.insert(2, 'mean_seconds', summary['seconds'] / summary['calls'])
+
+        return summary.sort_values('seconds', ascending=False)
+
+# =============================================================================
+# Instrumentation block
+# =============================================================================
+@contextlib.contextmanager
+def instrument(callback:Callable=None) -> Iterator[Recorder]:
+    '''
+    Record the stages of the generation pipeline run inside the block.
+    Records are kept in the yielded `Recorder` and passed, as they finish,
+    to `callback` (for instance `log_record`).
+
+    Example
+    ---
+    with src.profiling.instrument() as recorder:
+        src.methods.sequential(...)
+
+    recorder.summary()
+
+    Instrumentation is off outside these blocks, where each stage costs a
+    single check. Only the current process is recorded (not the workers of
+    `batch.run`).
+    '''
+    recorder = Recorder(callback=callback)
+    _RECORDERS.append(recorder)
+
+    try:
+        yield recorder
+
+    finally:
+        _RECORDERS.remove(recorder)
+
+def enabled() -> bool:
+    '''
+    True inside an `instrument` block, so that callers can skip computing
+    counters that nobody records.
+    '''
+    return len(_RECORDERS) > 0
+
+def log_record(record:dict) -> None:
+    '''
+    Callback for `instrument` that logs each record at DEBUG level.
+    '''
+    logger.debug(' '.join(f'{k}={v}' for k, v in record.items()))
+
+# =============================================================================
+# Stages
+# =============================================================================
+class _Stage:
+    '''
+    Timed stage of the pipeline, see `stage`.
+    '''
+    __slots__ = ('name', 'counters', 'start')
+
+    def __init__(self, name:str, counters:dict):
+        self.name = name
+        self.counters = counters
+        self.start = None
+
+    def __enter__(self) -> '_Stage':
+        _STAGES.append(self)
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        seconds = time.perf_counter() - self.start
+        _STAGES.pop()
+
+        record = {'stage': self.name, 'seconds': seconds, 'depth': len(_STAGES), **self.counters}
+
+        for recorder in _RECORDERS:
+            recorder._add(record)
+
+        return False
+
+    def add(self, counter:str, value:int=1) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+class _NullStage:
+    '''
+    Stage used while instrumentation is off, which does nothing.
+    '''
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullStage':
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def add(self, counter:str, value:int=1) -> None:
+        pass
+
+_NULL_STAGE = _NullStage()
+
+def stage(name:str, **counters) -> _Stage|_NullStage:
+    '''
+    Context manager timing a stage of the pipeline, with initial counters
+    that can be increased with its `add` method or with `count`.
+    '''
+    return _NULL_STAGE if len(_RECORDERS) == 0 else _Stage(name=name, counters=counters)
+
+def count(counter:str, value:int=1) -> None:
+    '''
+    Increase a counter of the innermost open stage.
+    '''
+    if len(_STAGES) > 0:
+        _STAGES[-1].add(counter=counter, value=value)
@@ -0,0 +1,185 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.grid import time_grid
+
+# Constants
+MONTHS = {'1': 'Jan', '2': 'Feb', '3': 'Mar', '4': 'Apr', '5': 'May', '6': 'Jun',
+          '7': 'Jul', '8': 'Aug', '9': 'Sep', '10': 'Oct', '11': 'Nov', '12': 'Dec'}
+
+
+# =============================================================================
+# Synthetic result
+# =============================================================================
+class SyntheticResult:
+    '''
+    Synthetic sequences of one (year, month, sky condition) stored as a
+    single contiguous (times, runs) array, in float64 or float32.
+
+    Slicing by time and by run returns views of the same array (no copy),
+    and the pd.DataFrame with the (hour, minute) index and 'synt1..N'
+    columns of the generation methods is only built by `to_frame`. Results
+    are stored with `save` as a `.npy` array plus a `.json` file with the
+    metadata, and `load` memory-maps them back.
+
+    Example
+    ---
+    result = src.methods.sequential(..., compact=True, float32=True)
+    result.sel(times=slice('6:00', '18:00'), runs=slice(0, 100)).to_frame()
+    '''
+    __slots__ = ('values', 'resolution', 'year', 'month', 'sky_condition', 'method', 'start', 'step')
+
+    def __init__(self, values:np.ndarray, resolution:int, year:int=None, month:int=None, sky_condition:str=None,
+                 method:str=None, float32:bool=False):
+        # Catching exception
+        if np.ndim(values) != 2:
+            raise ValueError(f'An invalid array with {np.ndim(values)} dimensions was given. It must have shape (times, runs).')
+
+        # Contiguous (times, runs) array, copied only when needed (memory-mapped arrays are kept as they are)
+        if isinstance(values, np.memmap) and (float32 == False or values.dtype == np.float32):
+            self.values = values
+        else:
+            self.values = np.ascontiguousarray(values, dtype=np.float32 if float32 == True else None)
+
+        self.resolution = resolution
+        self.year = year
+        self.month = month
+        self.sky_condition = sky_condition
+        self.method = method
+
+        # Position in the day of the first time and spacing between times (in steps of `resolution`)
+        self.start = 0
+        self.step = 1
+
+    @property
+    def key(self) -> str:
+        '''
+        Key of the result in the dictionaries of the generation methods,
+        e.g. 'Jan2021-sc3'.
+        '''
+        return f'{MONTHS[str(self.month)]}{self.year}-{self.sky_condition}'
+
+    @property
+    def n_times(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def n_runs(self) -> int:
+        return self.values.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def __len__(self) -> int:
+        return self.n_runs
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return self.values if dtype is None else self.values.astype(dtype)
+
+    def _position(self, time:int|str, end:bool=False) -> int:
+        '''
+        Position in the values of a time, given as a position or as an
+        'H:MM' (or 'H:MM:SS') string. Strings give the first value at or
+        after the time, or the one after the last value at or before it when
+        `end=True`.
+        '''
+        if isinstance(time, str):
+            position = time_grid(self.resolution).position(time) - self.start
+
+            return position // self.step + 1 if end == True else -(-position // self.step)
+
+        return time
+
+    def sel(self, times:slice=None, runs:slice=None) -> 'SyntheticResult':
+        '''
+        Sub-result of a range of times and runs, as a view of the same array.
+        The time bounds can be positions or 'H:MM' strings (both ends
+        included for strings, as in pandas label slicing).
+        '''
+        times = times or slice(None)
+        runs = runs or slice(None)
+
+        if isinstance(times.start, str) or isinstance(times.stop, str):
+            start = None if times.start is None else self._position(times.start)
+            stop = None if times.stop is None else self._position(times.stop, end=True)
+            times = slice(start, stop, times.step)
+
+        # Views skip the constructor, which would copy non-contiguous slices
+        result = SyntheticResult.__new__(SyntheticResult)
+
+        for attribute in SyntheticResult.__slots__:
+            setattr(result, attribute, getattr(self, attribute))
+
+        result.values = self.values[times, runs]
+
+        positions = range(self.n_times)[times]
+        result.start = self.start + positions.start*self.step
+        result.step = self.step * positions.step
+
+        return result
+
+    def __getitem__(self, key) -> 'SyntheticResult':
+        '''
+        `result[times, runs]` with slices, as `sel`.
+        '''
+        times, runs = key if isinstance(key, tuple) else (key, None)
+
+        return self.sel(times=times, runs=runs)
+
+    @property
+    def multiindex(self) -> pd.MultiIndex:
+        '''
+        (hour, minute) index of the whole day.
+        '''
+        return time_grid(self.resolution).multiindex
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        pd.DataFrame with the (hour, minute) index and the 'synt1..N' columns
+        returned by the generation methods.
+        '''
+        return pd.DataFrame(data=self.values,
+                            index=self.multiindex[self.start:self.start+self.n_times*self.step:self.step],
+                            columns=[f'synt{r+1}' for r in range(self.n_runs)],
+                            copy=False)
+
+    def save(self, path:str) -> str:
+        '''
+        Store the values in `<path>.npy` and the metadata in `<path>.json`.
+        Returns the path of the `.npy` file.
+        '''
+        path = path[:-4] if path.endswith('.npy') else path
+
+        np.save(path + '.npy', self.values)
+
+        with open(path + '.json', mode='w') as f:
+            json.dump({'resolution': self.resolution, 'year': self.year, 'month': self.month,
+                       'sky_condition': self.sky_condition, 'method': self.method, 'start': self.start, 'step': self.step}, f)
+
+        return path + '.npy'
+
+    @classmethod
+    def load(cls, path:str, mmap_mode:str='r') -> 'SyntheticResult':
+        '''
+        Load a result stored with `save`, memory-mapped by default (use
+        `mmap_mode=None` to read it into memory).
+        '''
+        path = path[:-4] if path.endswith('.npy') else path
+
+        # Catching exception
+        if not os.path.exists(path + '.json'):
+            raise ValueError(f'There is no synthetic result stored in {path}.npy.')
+
+        with open(path + '.json', mode='r') as f:
+            meta = json.load(f)
+
+        start, step = meta.pop('start', 0), meta.pop('step', 1)
+
+        result = cls(values=np.load(path + '.npy', mmap_mode=mmap_mode), **meta)
+        result.start, result.step = start, step
+
+        return result
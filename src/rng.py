@@ -0,0 +1,98 @@
+from collections.abc import Callable
+
+import numpy as np
+
+# Constants
+BLOCK_SIZE = 500
+
+
+# =============================================================================
+# Seed sequence
+# =============================================================================
+def seed_sequence(seed:int|np.random.SeedSequence=None) -> np.random.SeedSequence:
+    '''
+    Root np.random.SeedSequence of an integer seed (or of fresh OS entropy
+    when None). A SeedSequence is returned unchanged.
+    '''
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+# =============================================================================
+# Block seed
+# =============================================================================
+def block_seed(seed:int|np.random.SeedSequence, block:int) -> np.random.SeedSequence:
+    '''
+    Seed of the block number `block` of runs. It is the `block`-th child of
+    the root SeedSequence, as given by `np.random.SeedSequence(seed).spawn`,
+    so it only depends on the root seed and on the block number, not on the
+    total quantity of runs nor on how the runs are split between workers.
+    '''
+    root = seed_sequence(seed)
+
+    return np.random.SeedSequence(entropy=root.entropy, spawn_key=root.spawn_key + (block,), pool_size=root.pool_size)
+
+# =============================================================================
+# Split
+# =============================================================================
+def split(runs:int, workers:int, block_size:int=BLOCK_SIZE) -> list:
+    '''
+    Split `runs` between `workers` on block boundaries. Returns a list of
+    (offset, runs) pairs, one per worker with work, to be passed to the
+    generators together with the same seed and block size. Concatenating
+    the outputs of the workers gives the same runs as a single call.
+    '''
+    # Catching exception
+    if workers < 1:
+        raise ValueError(f'An invalid quantity of workers ({workers}) was selected. It must be a positive integer.')
+
+    n_blocks = -(-runs // block_size)
+
+    parts = []
+
+    for blocks in np.array_split(np.arange(n_blocks), min(workers, max(n_blocks, 1))):
+        if len(blocks) > 0:
+            offset = int(blocks[0]) * block_size
+            parts.append((offset, min((int(blocks[-1])+1) * block_size, runs) - offset))
+
+    return parts
+
+# =============================================================================
+# Draw
+# =============================================================================
+def draw(kernel:Callable, runs:int, seed:int|np.random.SeedSequence|np.random.Generator=None,
+         offset:int=0, block_size:int=BLOCK_SIZE) -> np.ndarray:
+    '''
+    Run a generation `kernel(runs, rng)` returning a (times, runs) array, or
+    a tuple of arrays with the runs along the second axis, according to the
+    kind of `seed`:
+
+    - None: a single call drawing from the global NumPy state (np.random),
+      as in the original methods.
+    - np.random.Generator: a single call drawing from that generator.
+    - int or np.random.SeedSequence: the runs [offset, offset+runs) are drawn
+      in blocks of `block_size` runs, each with its own `block_seed`, so the
+      result is bit-identical however the runs are split between processes
+      (see `split`). `offset` must be a multiple of `block_size`.
+    '''
+    if seed is None or isinstance(seed, np.random.Generator):
+        return kernel(runs, seed)
+
+    # Catching exception
+    if offset % block_size != 0:
+        raise ValueError(f'An invalid offset ({offset}) was selected. It must be a multiple of the block size ({block_size}).')
+
+    root = seed_sequence(seed)
+
+    blocks = [kernel(min(block_size, offset+runs-start), np.random.default_rng(block_seed(seed=root, block=start // block_size)))
+              for start in range(offset, offset+runs, block_size)]
+
+    if len(blocks) == 0:
+        return kernel(0, None)
+
+    if len(blocks) == 1:
+        return blocks[0]
+
+    # Kernels returning several arrays are concatenated array by array
+    if isinstance(blocks[0], tuple):
+        return tuple(np.concatenate(arrays, axis=1) for arrays in zip(*blocks))
+
+    return np.concatenate(blocks, axis=1)
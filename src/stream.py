@@ -0,0 +1,84 @@
+from collections.abc import Iterator
+
+import numpy as np
+
+from src import rng as random_state
+from src.model import SKY_CONDITIONS, SyntheticIrradianceModel
+
+
+# =============================================================================
+# Streamed generation
+# =============================================================================
+def generate(model:SyntheticIrradianceModel, sky_condition:str, runs:int, method:str='bootstrap', block_size:int=random_state.BLOCK_SIZE,
+             seed:int|np.random.SeedSequence=None, sequential:bool=True, confidence_interval:float=0.95) -> Iterator[np.ndarray]:
+    '''
+    Generate `runs` one-day synthetic sequences in blocks of `block_size` runs,
+    yielding one array of shape (timesteps, block) at a time, so the memory
+    used is bounded by the block size regardless of `runs`. The last block
+    holds the remaining runs.
+
+    Each block is drawn with its own `rng.block_seed`, so a block is
+    reproducible on its own given the root `seed` and its number, and the
+    concatenated blocks equal `model.sample` with the same seed and block
+    size.
+    '''
+    # Catching exception
+    if sky_condition not in SKY_CONDITIONS:
+        raise ValueError(f"An invalid sky condition ({sky_condition}) was selected. Select one of ['sc1', 'sc2', 'sc3', 'sc4', 'sc5'].")
+
+    if block_size < 1:
+        raise ValueError(f'An invalid block size ({block_size}) was selected. It must be a positive integer.')
+
+    if model.n_days[SKY_CONDITIONS.index(sky_condition)] == 0:
+        raise ValueError(f'There is no information related to the date {model.month}-{model.year} {sky_condition}.')
+
+    # A fixed root so that the blocks of one call share the same entropy
+    root = random_state.seed_sequence(seed)
+
+    return _blocks(model=model, sky_condition=sky_condition, runs=runs, method=method, block_size=block_size,
+                   root=root, sequential=sequential, confidence_interval=confidence_interval)
+
+def _blocks(model:SyntheticIrradianceModel, sky_condition:str, runs:int, method:str, block_size:int,
+            root:np.random.SeedSequence, sequential:bool, confidence_interval:float) -> Iterator[np.ndarray]:
+    '''
+    Lazy loop behind `generate`, kept apart so that the arguments are checked
+    when `generate` is called rather than on the first block.
+    '''
+    for start in range(0, runs, block_size):
+        yield model.sample(sky_condition=sky_condition,
+                           runs=min(block_size, runs-start),
+                           method=method,
+                           seed=root,
+                           sequential=sequential,
+                           confidence_interval=confidence_interval,
+                           offset=start,
+                           block_size=block_size)
+
+# =============================================================================
+# Streamed generation to disk
+# =============================================================================
+def to_disk(model:SyntheticIrradianceModel, path:str, sky_condition:str, runs:int, method:str='bootstrap', block_size:int=random_state.BLOCK_SIZE,
+            seed:int|np.random.SeedSequence=None, sequential:bool=True, confidence_interval:float=0.95, dtype:np.dtype=np.float64) -> str:
+    '''
+    Write `runs` one-day synthetic sequences to a `.npy` file of shape
+    (timesteps, runs), block by block through a memory map, so the whole
+    result never needs to fit in memory. The output is the same as
+    concatenating the blocks of `generate` with the same arguments.
+
+    The file can be read back lazily with `np.load(path, mmap_mode='r')`.
+    '''
+    blocks = generate(model=model, sky_condition=sky_condition, runs=runs, method=method, block_size=block_size,
+                      seed=seed, sequential=sequential, confidence_interval=confidence_interval)
+
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(model.indexes[0].n_times, runs))
+
+    start = 0
+
+    for block in blocks:
+        out[:, start:start+block.shape[1]] = block
+        start += block.shape[1]
+
+    out.flush()
+    del out
+
+    return path
@@ -0,0 +1,263 @@
+import collections
+import functools
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from src import profiling
+from src import utils
+from src.grid import fill_days, resolution_of, time_grid
+
+# Constants
+CACHE_SIZE = 32
+
+# Least recently used transition indexes, see `cached_index`
+_INDEXES = collections.OrderedDict()
+
+
+# =============================================================================
+# Day matrix
+# =============================================================================
+def day_matrix(data:pd.DataFrame, irradiance_column:str, year:int, month:int, sky_condition:str) -> pd.DataFrame:
+    '''
+    Historical days of a (year, month, sky condition) as a (days x times)
+    pd.DataFrame, with the day of the month as index and the 'H:MM' times as
+    columns. The sky condition of each day is given by
+    `utils.sky_condition_labels`.
+    '''
+    # Catching exception
+    if sky_condition not in ['sc1', 'sc2', 'sc3', 'sc4', 'sc5']:
+        raise ValueError(f"An invalid sky condition ({sky_condition}) was selected. Select one of ['sc1', 'sc2', 'sc3', 'sc4', 'sc5'].")
+
+    # Constants
+    GRID = time_grid(resolution_of(data.index))
+
+    # DataFrame filtered by date and between 6:00 to 18:00h range
+    data = data.loc[(data.index.year == year) & (data.index.month == month)]
+
+    # Categorization according to clear-sky index (kc) value
+    labels = utils.sky_condition_labels(data=data)
+
+    # Days of the month on the time grid (missing times are NaN)
+    values, dates = GRID.align(data[irradiance_column])
+
+    rows = labels.reindex(dates, fill_value=0).to_numpy() == int(sky_condition[-1])
+
+    return pd.DataFrame(values[rows], index=dates.day[rows].tolist(), columns=GRID.labels)
+
+# =============================================================================
+# Transition index
+# =============================================================================
+class TransitionIndex:
+    '''
+    Reusable index of the historical days of one (year, month, sky condition)
+    for the sequential methods.
+
+    For each time the values of all days are stored sorted, together with the
+    argsort permutation and the values of the following time in that same
+    order. The confidence-band filter around the previous synthetic value is
+    then a `searchsorted` range lookup over the sorted column, and the band
+    statistics of the following time come from prefix sums, so every query
+    costs O(log n) in the number of historical days n.
+
+    The index is built once and can be passed to `methods.sequential` in
+    place of the raw pd.DataFrame. Missing times of a day are filled from
+    the other times of that day (see `grid.fill_days`) and days without
+    any value are left out, so the sorted columns and prefix sums never
+    hold NaN.
+    '''
+    def __init__(self, matrix:np.ndarray, resolution:int, days:np.ndarray=None):
+        # Historical (days x times) matrix, without gaps
+        matrix = fill_days(matrix)
+        days = np.arange(1, matrix.shape[0]+1) if days is None else np.asarray(days)
+
+        measured = ~np.isnan(matrix).all(axis=1) if matrix.shape[1] > 0 else np.ones(matrix.shape[0], dtype=bool)
+
+        self.matrix = matrix[measured]
+        self.resolution = resolution
+        self.days = days[measured]
+
+        n_days, n_times = self.matrix.shape
+
+        # Per-time argsort permutations and sorted values, shape (times, days)
+        self.order = np.argsort(self.matrix, axis=0, kind='stable').T
+        self.sorted = np.take_along_axis(self.matrix, self.order.T, axis=0).T.copy()
+
+        # Values of the following time in the order of the previous time, shape (times-1, days)
+        self.following = np.take_along_axis(self.matrix[:, 1:], self.order[:-1].T, axis=0).T.copy()
+
+        # Prefix sums of the following time (centered for numerical stability)
+        self._center = self.following.mean(axis=1, keepdims=True) if n_days > 0 else np.zeros((max(n_times-1, 0), 1))
+        centered = self.following - self._center
+
+        self._sum = np.zeros((max(n_times-1, 0), n_days+1))
+        self._sum_squares = np.zeros((max(n_times-1, 0), n_days+1))
+        np.cumsum(centered, axis=1, out=self._sum[:, 1:])
+        np.cumsum(centered**2, axis=1, out=self._sum_squares[:, 1:])
+
+        # Sample standard error of each time (undefined with a single day)
+        if n_days > 1:
+            self.standard_error = np.std(self.matrix, axis=0, ddof=1) / np.sqrt(n_days)
+        else:
+            self.standard_error = np.full(n_times, np.nan)
+
+        # Range min/max tables of the following time, built on first use
+        self._min_table = None
+        self._max_table = None
+
+        # Confidence band half-widths per confidence interval, see `half_width`
+        self._half_width = {}
+
+    @classmethod
+    def from_data(cls, data:pd.DataFrame, irradiance_column:str, year:int, month:int, sky_condition:str) -> 'TransitionIndex':
+        '''
+        Build the index from a pd.DataFrame with the irradiance and clear-sky
+        index (kc) columns, as returned by `methods.clear_sky_index`.
+        '''
+        with profiling.stage('transition_index', rows=len(data)) as timer:
+            RESOLUTION = resolution_of(data.index)
+
+            temp_aux_data = day_matrix(data=data, irradiance_column=irradiance_column, year=year, month=month, sky_condition=sky_condition)
+
+            timer.add('days', len(temp_aux_data))
+
+            return cls(matrix=temp_aux_data.to_numpy(dtype=float), resolution=RESOLUTION, days=np.array(temp_aux_data.index))
+
+    @property
+    def n_days(self) -> int:
+        return self.matrix.shape[0]
+
+    def half_width(self, confidence_interval:float) -> np.ndarray:
+        '''
+        Half-width of the confidence band of each time, z * std / sqrt(n)
+        with the sample std of the historical days. It is computed once per
+        confidence interval.
+        '''
+        if confidence_interval not in self._half_width:
+            self._half_width[confidence_interval] = z_score(confidence_interval=confidence_interval) * self.standard_error
+
+        return self._half_width[confidence_interval]
+
+    @property
+    def n_times(self) -> int:
+        return self.matrix.shape[1]
+
+    def band(self, time:int, lower:np.ndarray, upper:np.ndarray) -> tuple:
+        '''
+        Positions [lo, hi) in the sorted order of `time` of the days whose
+        value lies in the closed interval [lower, upper].
+        '''
+        lo = np.searchsorted(self.sorted[time], lower, side='left')
+        hi = np.searchsorted(self.sorted[time], upper, side='right')
+
+        return lo, np.maximum(hi, lo)
+
+    def draw(self, time:int, lo:np.ndarray, hi:np.ndarray, uniform:np.ndarray) -> np.ndarray:
+        '''
+        Value of `time+1` of one day drawn uniformly from each band [lo, hi),
+        given uniform random numbers in [0, 1). The bands must be non-empty.
+        '''
+        position = lo + np.floor(uniform * (hi - lo)).astype(int)
+
+        return self.following[time, np.minimum(position, hi-1)]
+
+    def moments(self, time:int, lo:np.ndarray, hi:np.ndarray) -> tuple:
+        '''
+        Mean, population standard deviation, min and max of `time+1` over the
+        days of each band [lo, hi). The bands must be non-empty.
+        '''
+        count = hi - lo
+
+        s1 = (self._sum[time, hi] - self._sum[time, lo]) / count
+        s2 = (self._sum_squares[time, hi] - self._sum_squares[time, lo]) / count
+
+        mean = s1 + self._center[time, 0]
+        std = np.sqrt(np.maximum(s2 - s1**2, 0))
+
+        if self._min_table is None:
+            self._min_table = _sparse_table(self.following, np.minimum)
+            self._max_table = _sparse_table(self.following, np.maximum)
+
+        level = np.floor(np.log2(count)).astype(int)
+        width = 1 << level
+
+        minimum = np.minimum(self._min_table[level, time, lo], self._min_table[level, time, hi-width])
+        maximum = np.maximum(self._max_table[level, time, lo], self._max_table[level, time, hi-width])
+
+        return mean, std, minimum, maximum
+
+# =============================================================================
+# Cached transition index
+# =============================================================================
+def cached_index(data:pd.DataFrame, irradiance_column:str, year:int, month:int, sky_condition:str) -> TransitionIndex:
+    '''
+    `TransitionIndex.from_data`, memoized for the last CACHE_SIZE (data,
+    irradiance column, year, month, sky condition) used, so that repeated
+    calls on the same month (e.g. a sweep over confidence intervals) build
+    the index only once. The pd.DataFrame is identified by object, so it
+    must not be modified in place between calls (or `clear_cache` must be
+    called after modifying it).
+    '''
+    key = (id(data), irradiance_column, year, month, sky_condition)
+    entry = _INDEXES.get(key)
+
+    # The weak reference guards against the id of a deleted pd.DataFrame being reused
+    if entry is not None and entry[0]() is data:
+        _INDEXES.move_to_end(key)
+
+        return entry[1]
+
+    index = TransitionIndex.from_data(data=data, irradiance_column=irradiance_column, year=year, month=month, sky_condition=sky_condition)
+
+    _INDEXES[key] = (weakref.ref(data), index)
+
+    while len(_INDEXES) > CACHE_SIZE:
+        _INDEXES.popitem(last=False)
+
+    return index
+
+def clear_cache() -> None:
+    '''
+    Remove every transition index memoized by `cached_index`.
+    '''
+    _INDEXES.clear()
+
+# =============================================================================
+# Z-score
+# =============================================================================
+@functools.lru_cache(maxsize=128)
+def z_score(confidence_interval:float) -> float:
+    '''
+    Two-sided Gaussian z-score of a confidence interval. `ndtri` is the
+    inverse of the standard normal CDF, as `scipy.stats.norm.ppf` (which
+    is slower to import).
+    '''
+    # Imported here so that the methods without confidence band do not load scipy
+    import scipy.special
+
+    ALPHA = 1 - confidence_interval
+
+    return scipy.special.ndtri(confidence_interval+(ALPHA/2))
+
+# =============================================================================
+# Sparse table
+# =============================================================================
+def _sparse_table(values:np.ndarray, reduce:np.ufunc) -> np.ndarray:
+    '''
+    Sparse table for range min/max queries along the last axis, with shape
+    (levels, times, days). Level k holds the reduction of 2**k consecutive
+    values starting at each position.
+    '''
+    n_days = values.shape[-1]
+    levels = max(int(np.log2(n_days)) + 1, 1) if n_days > 0 else 1
+
+    table = np.empty((levels,) + values.shape)
+    table[0] = values
+
+    for k in range(1, levels):
+        half = 1 << (k-1)
+        table[k] = table[k-1]
+        table[k, :, :n_days-half] = reduce(table[k-1, :, :n_days-half], table[k-1, :, half:])
+
+    return table
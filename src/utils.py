@@ -1,8 +1,13 @@
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import scipy
 
+from src import profiling
+from src.grid import fill_days, time_grid
+
+# Constants
+KC_THRESHOLDS = [0.2, 0.4, 0.6, 0.67]
+
 
 # =============================================================================
 # Cumulative density function
@@ -56,6 +61,93 @@ def lognormal_test(data:np.array) -> float:
     '''
     return np.round(a=scipy.stats.kstest(rvs=data, cdf='lognorm', args=scipy.stats.lognorm.fit(data)).pvalue, decimals=2)
 
+# =============================================================================
+# Sky condition of each day
+# =============================================================================
+def sky_condition_labels(data:pd.DataFrame) -> pd.Series:
+    '''
+    Sky condition number (1 to 5) of each day, from its median clear-sky
+    index (kc) between 6:00 and 18:00h and the thresholds in KC_THRESHOLDS
+    (see `analysis`). Days without kc data are labelled 0.
+    '''
+    with profiling.stage('categorization', rows=len(data)):
+        # Median value of clear-sky index (kc)
+        median_kc = data['kc'].loc[(data.index.hour >= 6) & (data.index.hour < 18)].resample(rule='1d').median()
+
+        # Categorization according to clear-sky index (kc) value
+        labels = np.digitize(median_kc.values, bins=KC_THRESHOLDS, right=True) + 1
+        labels[np.isnan(median_kc.values)] = 0
+
+    # Local days, as the days of `grid.TimeGrid.align`
+    dates = median_kc.index.tz_localize(None) if median_kc.index.tz is not None else median_kc.index
+
+    return pd.Series(labels, index=dates)
+
+# =============================================================================
+# Single-pass analysis of the five sky conditions
+# =============================================================================
+def _analysis(data:pd.DataFrame, labels:pd.Series, irradiance_column:str, resolution:int) -> dict:
+    '''
+    Statistics (mean, std, min and max per time) and day matrix of each sky
+    condition of one month, from the day labels of `sky_condition_labels`.
+    '''
+    # Constants
+    GRID = time_grid(resolution)
+
+    aux_irradiance = {'stochastic': {}, 'bootstrap': {}}
+
+    # Days of the month on the time grid (missing times are NaN) and their sky condition
+    values, dates = GRID.align(data[irradiance_column])
+
+    day_labels = labels.reindex(dates, fill_value=0).to_numpy()
+    days = dates.day.to_numpy()
+
+    # Times of the data, e.g. (h, 30) for hourly data at :30
+    INDEX = GRID.multiindex_at(offset=GRID.offset(data.index))
+
+    for sc in range(1, 6):
+        rows = day_labels == sc
+        sc_days = days[rows]
+
+        # Bootstrap method data, with the gaps of each day filled so the drawn days are complete
+        matrix = values[rows]
+
+        aux_irradiance['bootstrap'][f'sc{sc}'] = pd.DataFrame(fill_days(matrix) if np.isnan(matrix).any() else matrix, index=list(sc_days), columns=GRID.labels)
+
+        # Stochastic method data
+        if len(sc_days) == 0:
+            aux_irradiance['stochastic'][f'sc{sc}'] = pd.DataFrame(columns=['mean', 'std', 'min', 'max'], dtype=float)
+
+        else:
+            aux_irradiance['stochastic'][f'sc{sc}'] = pd.DataFrame({'mean': np.nanmean(matrix, axis=0),
+                                                                    'std': np.nanstd(matrix, axis=0, ddof=1) if len(sc_days) > 1 else np.nan,
+                                                                    'min': np.nanmin(matrix, axis=0),
+                                                                    'max': np.nanmax(matrix, axis=0)}, index=INDEX).fillna(0)
+
+    return aux_irradiance
+
+# =============================================================================
+# Statistics of each time
+# =============================================================================
+def day_statistics(matrix:np.ndarray) -> np.ndarray:
+    '''
+    Mean, sample std, min and max of each time of a (days x times) matrix
+    with at least one day, ignoring NaN values and with 0 where they are
+    undefined (e.g. the std of a single day), as the stochastic method data
+    of `analysis`.
+
+    Returns an array of shape (4, times).
+    '''
+    matrix = np.asarray(matrix, dtype=float)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        statistics = np.array([np.nanmean(matrix, axis=0),
+                               np.nanstd(matrix, axis=0, ddof=1) if len(matrix) > 1 else np.full(matrix.shape[1], np.nan),
+                               np.nanmin(matrix, axis=0),
+                               np.nanmax(matrix, axis=0)])
+
+    return np.nan_to_num(statistics, nan=0.)
+
 # =============================================================================
 # Convierte una serie temporal a resolución horaria.
 # =============================================================================
@@ -73,60 +165,49 @@ def analysis(df:pd.DataFrame, year:int, month:int, irradiance_column:str, resolu
     - Sky Condition 3 (SC3): Partly covered, when 0.4 < k <= 0.6
     - Sky Condition 4 (SC4): Mostly clear, when 0.6 < k <= 0.67
     - Sky Condition 5 (SC5): Totally clear, when k > 0.67
-    '''
-    # Array list to store daily irradiance values from irrad_range
-    aux_irradiance = {'stochastic': {}, 'bootstrap': {}}
 
+    The days are labelled in a single pass and only the mean, std, min and
+    max of each time are computed for the stochastic method.
+    '''
     # Constants
-    TIMES = [f'{i}:0{j}' if j < 10 else f'{i}:{j}' for i in range(0, 24) for j in range(0, 60, resolution)]
+    TIMES = time_grid(resolution).labels
 
     MONTHS = {'1': 'Jan', '2': 'Feb', '3': 'Mar', '4': 'Apr', '5': 'May', '6': 'Jun',
               '7': 'Jul', '8': 'Aug', '9': 'Sep', '10': 'Oct', '11': 'Nov', '12': 'Dec'}
 
-    # DataFrame filtered by date and between 6:00 to 18:00h range
+    # DataFrame filtered by date
     data = df.loc[(df.index.year == year) & (df.index.month == month)]
 
-    # Median value of clear-sky index (kc)
-    median_kc = data['kc'].loc[(data.index.hour >= 6) & (data.index.hour < 18)].resample(rule='1d').median()
-
-    # Categorization according to clear-sky index (kc) value
-    totally_covered = np.array(median_kc.loc[median_kc <= 0.2].index.day)
-    mostly_covered = np.array(median_kc.loc[(0.2 < median_kc) & (median_kc <= 0.4)].index.day)
-    partly_covered = np.array(median_kc.loc[(0.4 < median_kc) & (median_kc <= 0.6)].index.day)
-    mostly_clear = np.array(median_kc.loc[(0.6 < median_kc) & (median_kc <= 0.67)].index.day)
-    totally_clear = np.array(median_kc.loc[median_kc > 0.67].index.day)
-
-    for i, j in enumerate([totally_covered, mostly_covered, partly_covered, mostly_clear, totally_clear]):
-        aux_data = data.loc[data.index.day.isin(j)]
-
-        # Stochastic method data
-        aux_irradiance['stochastic'][f'sc{i+1}'] = aux_data.groupby([aux_data.index.hour, aux_data.index.minute])[irradiance_column].describe().fillna(0)
+    # Array list to store daily irradiance values from irrad_range
+    labels = sky_condition_labels(data=data)
 
-        # Bootstrap method data
-        aux_irradiance['bootstrap'][f'sc{i+1}'] = pd.DataFrame(aux_data[irradiance_column].values.reshape(len(aux_data.index.day.unique()), len(TIMES)), index=list(aux_data.index.day.unique()), columns=TIMES)
+    with profiling.stage('analysis', rows=len(data)):
+        aux_irradiance = _analysis(data=data, labels=labels, irradiance_column=irradiance_column, resolution=resolution)
 
     # Statistical analysis plot
     if plot == True:
+        # Imported here so that the analysis without plot does not load matplotlib
+        import matplotlib.pyplot as plt
+
         XTICKS = np.arange(start=0, stop=len(TIMES), step=50)
         LABELS = [TIMES[i] for i in XTICKS]
 
-        for i, j in enumerate([totally_covered, mostly_covered, partly_covered, mostly_clear, totally_clear]):
-            aux_data = data[irradiance_column].loc[data.index.day.isin(j)]
+        for i in range(5):
+            stats = aux_irradiance['stochastic'][f'sc{i+1}']
+            temp_aux_data = aux_irradiance['bootstrap'][f'sc{i+1}']
 
             hor = 8
             ver = 5
             plt.figure(figsize=(hor,ver))
 
-            if aux_data.empty == False:
-                temp_aux_data = pd.DataFrame(aux_data.values.reshape(len(aux_data.index.day.unique()), len(TIMES)), columns=TIMES)
-
+            if temp_aux_data.empty == False:
                 plt.plot(temp_aux_data.T.values, color='black', alpha=0.1, linestyle='', marker='.', markersize=2, fillstyle='none')
 
-                plt.plot(aux_irradiance['stochastic'][f'sc{i+1}']['max'].values, color='#1580E4', marker='.', markersize=4, linestyle='', label='Max')
-                plt.plot(aux_irradiance['stochastic'][f'sc{i+1}']['mean'].values, color='#2DBD07', marker='.', markersize=4, linestyle='', label='Mean')
-                plt.plot(aux_irradiance['stochastic'][f'sc{i+1}']['min'].values, color='coral', marker='.', markersize=4, linestyle='', label='Min')
+                plt.plot(stats['max'].values, color='#1580E4', marker='.', markersize=4, linestyle='', label='Max')
+                plt.plot(stats['mean'].values, color='#2DBD07', marker='.', markersize=4, linestyle='', label='Mean')
+                plt.plot(stats['min'].values, color='coral', marker='.', markersize=4, linestyle='', label='Min')
 
-                plt.fill_between(x=np.arange(len(aux_irradiance['stochastic'][f'sc{i+1}'])), y1=aux_irradiance['stochastic'][f'sc{i+1}']['max'], y2=aux_irradiance['stochastic'][f'sc{i+1}']['min'], color='whitesmoke', alpha=0.35, label='Stochastic Range')
+                plt.fill_between(x=np.arange(len(stats)), y1=stats['max'], y2=stats['min'], color='whitesmoke', alpha=0.35, label='Stochastic Range')
 
                 plt.title(f'Irradiance Behaviour for {MONTHS[str(month)]}-{year} (SC{i+1})')
                 plt.ylabel('Irradiance, $W/m^2$')
@@ -137,11 +218,32 @@ def analysis(df:pd.DataFrame, year:int, month:int, irradiance_column:str, resolu
                 plt.xticks(rotation=0, ticks=XTICKS, labels=LABELS)
                 plt.minorticks_on()
                 plt.ylim(0, None)
-                plt.xlim(0, len(aux_irradiance['stochastic'][f'sc{i+1}']))
+                plt.xlim(0, len(stats))
                 plt.grid(True)
                 plt.grid(visible=True, which='major', color='grey', linestyle='-', linewidth=0.5)
                 plt.grid(visible=True, which='minor', color='lightgrey', linestyle='-', linewidth=0.3, alpha=0.2)
                 plt.tight_layout
                 plt.legend(loc='best', fontsize=9) # bbox_to_anchor=(1,1)
 
-    return aux_irradiance
\ No newline at end of file
+    return aux_irradiance
+
+# =============================================================================
+# Analysis of the twelve months of a year
+# =============================================================================
+def analysis_year(df:pd.DataFrame, year:int, irradiance_column:str, resolution:int) -> dict:
+    '''
+    `analysis` (without plot) of every month of `year` in one call, as a
+    dictionary {month: analysis}. The year is filtered and its days are
+    labelled by sky condition only once.
+    '''
+    # DataFrame filtered by date
+    data = df.loc[df.index.year == year]
+
+    labels = sky_condition_labels(data=data)
+
+    months = data.index.month.to_numpy()
+
+    return {int(month): _analysis(data=data.loc[months == month],
+                                  labels=labels.loc[labels.index.month == month],
+                                  irradiance_column=irradiance_column,
+                                  resolution=resolution) for month in np.unique(months)}
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src
+
+# Constants
+YEAR = 2019
+MONTH = 3
+RESOLUTION = 30
+
+
+# =============================================================================
+# Data
+# =============================================================================
+@pytest.fixture(scope='module')
+def gapped() -> pd.DataFrame:
+    '''
+    One month of clear days (kc = 0.9) at 30 minutes, with five hours of
+    one day in the middle of the morning missing.
+    '''
+    index = pd.date_range(start=f'{YEAR}-{MONTH:02d}-01', end=f'{YEAR}-{MONTH:02d}-31 23:30', freq=f'{RESOLUTION}min')
+    hours = index.hour + index.minute/60
+
+    rng = np.random.default_rng(0)
+    ghi = np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None) * 900 * rng.uniform(0.9, 1.0, size=len(index))
+
+    df = pd.DataFrame({'ghi_wm2': ghi, 'kc': 0.9}, index=index)
+
+    return df.drop(df.index[4*48+16:4*48+26])
+
+# =============================================================================
+# Tests
+# =============================================================================
+@pytest.mark.parametrize('method', ['bootstrap', 'stochastic'])
+def test_sequential_with_gaps_has_no_nan(gapped, method):
+    synt = src.methods.sequential(data=gapped, irradiance_column='ghi_wm2', year=YEAR, month=MONTH, sky_condition='sc5',
+                                  method=method, confidence_interval=0.95, runs=50, seed=0)
+
+    assert synt.shape == (24*60//RESOLUTION, 50)
+    assert not np.isnan(synt.to_numpy()).any()
+
+@pytest.mark.parametrize('method', ['bootstrap', 'stochastic'])
+@pytest.mark.parametrize('sequential', [True, False])
+def test_model_with_gaps_has_no_nan(gapped, method, sequential):
+    model = src.model.SyntheticIrradianceModel().fit(df=gapped, irradiance_column='ghi_wm2', year=YEAR, month=MONTH)
+
+    assert not np.isnan(model.sample(sky_condition='sc5', runs=50, method=method, seed=0, sequential=sequential)).any()
+
+def test_bootstrap_data_with_gaps_has_no_nan(gapped):
+    aux_irradiance = src.utils.analysis(df=gapped, year=YEAR, month=MONTH, irradiance_column='ghi_wm2', resolution=RESOLUTION, plot=False)
+
+    assert not aux_irradiance['bootstrap']['sc5'].isna().any().any()
+
+def test_transition_index_fills_gaps_within_the_day():
+    matrix = np.array([[0., np.nan, 2., np.nan], [np.nan, np.nan, np.nan, np.nan], [1., 1., 1., 1.]])
+
+    index = src.transition.TransitionIndex(matrix=matrix, resolution=360)
+
+    assert index.days.tolist() == [1, 3]
+    assert index.matrix.tolist() == [[0., 1., 2., 2.], [1., 1., 1., 1.]]
+    assert not np.isnan(index.standard_error).any()
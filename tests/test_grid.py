@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+import src
+from src.grid import time_grid
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+def test_analysis_keeps_the_times_of_the_data():
+    # Hourly data at :30, as madrid-60 and seville-60
+    index = pd.date_range(start='2019-03-01 00:30', end='2019-03-31 23:30', freq='60min')
+    df = pd.DataFrame({'ghi_wm2': 100., 'kc': 0.9}, index=index)
+
+    stochastic = src.utils.analysis(df=df, year=2019, month=3, irradiance_column='ghi_wm2', resolution=60, plot=False)['stochastic']['sc5']
+
+    assert stochastic.index.tolist()[:2] == [(0, 30), (1, 30)]
+
+def test_align_uses_local_days_and_averages_repeated_times():
+    # End of daylight saving time in Madrid, 2:00 to 3:00 is repeated
+    index = pd.date_range(start='2019-10-26 22:00', end='2019-10-27 21:30', freq='30min', tz='UTC').tz_convert('Europe/Madrid')
+
+    matrix, dates = time_grid(30).align(pd.Series(np.arange(len(index)), index=index))
+
+    assert dates.tolist() == [pd.Timestamp('2019-10-27')]
+    assert matrix[0, :7].tolist() == [0., 1., 2., 3., 5., 6., 8.]
+
+def test_align_leaves_the_skipped_hour_missing():
+    # Start of daylight saving time in Madrid, 2:00 to 3:00 does not exist
+    index = pd.date_range(start='2019-03-30 23:00', end='2019-03-31 21:30', freq='30min', tz='UTC').tz_convert('Europe/Madrid')
+
+    matrix, dates = time_grid(30).align(pd.Series(np.arange(len(index), dtype=float), index=index))
+
+    assert dates.tolist() == [pd.Timestamp('2019-03-31')]
+    assert np.isnan(matrix[0, 4:6]).all()
+    assert not np.isnan(matrix[0, 6:]).any()
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+import src
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+def test_load_maps_the_cached_columns(tmp_path):
+    index = pd.date_range(start='2019-01-01', periods=48, freq='30min', name='timestamp')
+    pd.DataFrame({'ghi_wm2': np.arange(48.), 'tamb_c': 20.}, index=index).to_csv(tmp_path / 'site-30.csv')
+
+    src.loader.load(path=str(tmp_path / 'site-30.csv'))
+    df = src.loader.load(path=str(tmp_path / 'site-30.csv'))
+
+    # Float64 columns are the memory-mapped arrays, not copies
+    assert all(isinstance(block.values, np.memmap) for block in df._mgr.blocks)
+    assert df['ghi_wm2'].tolist() == list(range(48))
+
+    # Writes stay in memory and never reach the cache
+    df.iloc[0, 0] = -1.
+
+    assert src.loader.load(path=str(tmp_path / 'site-30.csv')).iloc[0, 0] == 0.
+
+def test_load_float32(tmp_path):
+    index = pd.date_range(start='2019-01-01', periods=48, freq='30min', name='timestamp')
+    pd.DataFrame({'ghi_wm2': np.arange(48.)}, index=index).to_csv(tmp_path / 'site-30.csv')
+
+    assert src.loader.load(path=str(tmp_path / 'site-30.csv'), float32=True)['ghi_wm2'].dtype == np.float32
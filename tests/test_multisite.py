@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src
+
+# Constants
+YEAR = 2019
+MONTH = 6
+
+
+# =============================================================================
+# Data
+# =============================================================================
+@pytest.fixture(scope='module')
+def model() -> src.multisite.MultiSiteModel:
+    '''
+    Two hourly sites over one month of clear days (kc = 0.9).
+    '''
+    index = pd.date_range(start=f'{YEAR}-{MONTH:02d}-01', end=f'{YEAR}-{MONTH:02d}-30 23:00', freq='60min')
+    profile = np.clip(np.sin((index.hour - 6) / 12 * np.pi), 0, None)
+
+    rng = np.random.default_rng(0)
+    data = {site: pd.DataFrame({'ghi_wm2': profile * 900 * rng.uniform(0.8, 1.0, size=len(index)), 'kc': 0.9}, index=index)
+            for site in ['a', 'b']}
+
+    return src.multisite.MultiSiteModel().fit(data=data, irradiance_column='ghi_wm2', year=YEAR, month=MONTH)
+
+# =============================================================================
+# Tests
+# =============================================================================
+@pytest.mark.parametrize('method', ['bootstrap', 'copula'])
+@pytest.mark.parametrize('seed', [None, 0, np.random.default_rng(0)])
+def test_sample_shape(model, method, seed):
+    synt = model.sample(runs=7, method=method, seed=seed)
+
+    assert synt.shape == (2, 24, 7)
+    assert not np.isnan(synt).any()
+
+@pytest.mark.parametrize('method', ['bootstrap', 'copula'])
+@pytest.mark.parametrize('seed', [None, 0])
+def test_sample_without_runs(model, method, seed):
+    assert model.sample(runs=0, method=method, seed=seed).shape == (2, 24, 0)
+
+@pytest.mark.parametrize('method', ['bootstrap', 'copula'])
+def test_sample_is_reproducible(model, method):
+    assert np.array_equal(model.sample(runs=600, method=method, seed=1), model.sample(runs=600, method=method, seed=1))
+
+def test_bootstrap_shares_the_day_between_sites(model):
+    synt = model.sample(runs=50, method='bootstrap', seed=0)
+
+    for r in range(50):
+        day = np.flatnonzero((model.matrix[0] == synt[0, :, r]).all(axis=1))[0]
+
+        assert np.array_equal(model.matrix[1, day], synt[1, :, r])